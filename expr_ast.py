@@ -1,131 +1,149 @@
 from __future__ import annotations
+import re
 from dataclasses import dataclass
+from enum import IntEnum
+from functools import lru_cache
 from typing import List, Optional, Tuple, Dict, Any
 
 
 # --- Tokens ---
 
-@dataclass
+class TK(IntEnum):
+    """Token kinds; ints keep the parser's kind checks to a plain integer compare."""
+    IDENT = 0
+    NUMBER = 1
+    STRING = 2
+    OP = 3
+    PAREN = 4
+    BRACE = 5
+    BRACKET = 6
+    COMMA = 7
+    ASSIGN = 8
+
+
+@dataclass(slots=True)
 class Token:
-    kind: str
+    kind: TK
     text: str
 
 
+# Operator tables; the scanner pattern below is built from them once at import.
+_TWO_CHAR_OPS = ("<<", ">>", "<=", ">=", "==", "!=", "&&", "||")
+
+_SINGLE_KIND: Dict[str, TK] = {
+    **{c: TK.BRACE for c in '{}'},
+    **{c: TK.PAREN for c in '()'},
+    **{c: TK.BRACKET for c in '[]'},
+    ',': TK.COMMA,
+    '=': TK.ASSIGN,
+    **{c: TK.OP for c in '+-*/%&|^~!<>?:.'},
+}
+
+# Token kind for every scanner group except op1 (looked up in _SINGLE_KIND)
+_GROUP_KIND = {'ident': TK.IDENT, 'number': TK.NUMBER, 'string': TK.STRING, 'op2': TK.OP, 'other': TK.OP}
+
+# Master scanner: one alternation per token class, tried in order.
+_SCAN = re.compile(
+    r'(?P<ws>\s+)'
+    r'|(?P<ident>[^\W\d]\w*)'
+    r'|(?P<number>\d[0-9A-Za-z.]*)'
+    r'|(?P<string>"(?:\\[\s\S]?|[^"\\])*"?)'
+    rf'|(?P<op2>{"|".join(map(re.escape, _TWO_CHAR_OPS))})'
+    rf'|(?P<op1>[{re.escape("".join(_SINGLE_KIND))}])'
+    r'|(?P<other>[\s\S])'
+)
+
+
 def tokenize(src: str) -> List[Token]:
     tokens: List[Token] = []
-    i = 0
-    n = len(src)
-    while i < n:
-        ch = src[i]
-        # Skip whitespace
-        if ch.isspace():
-            i += 1
-            continue
-        # Identifiers
-        if ch.isalpha() or ch == '_':
-            start = i
-            i += 1
-            while i < n and (src[i].isalnum() or src[i] == '_'):
-                i += 1
-            tokens.append(Token('ident', src[start:i]))
+    for m in _SCAN.finditer(src):
+        group = m.lastgroup
+        if group == 'ws':
             continue
-        # Numbers (very simple, keep spelling)
-        if ch.isdigit():
-            start = i
-            i += 1
-            while i < n and (src[i].isalnum() or src[i] in '.xX'):
-                i += 1
-            tokens.append(Token('number', src[start:i]))
-            continue
-        # Strings
-        if ch == '"':
-            start = i
-            i += 1
-            while i < n:
-                if src[i] == '\\':
-                    i += 2
-                    continue
-                if src[i] == '"':
-                    i += 1
-                    break
-                i += 1
-            tokens.append(Token('string', src[start:i]))
-            continue
-        # Two-char operators
-        if i + 1 < n and src[i:i+2] in ("<<", ">>", "<=", ">=", "==", "!=", "&&", "||"):
-            tokens.append(Token('op', src[i:i+2]))
-            i += 2
-            continue
-        # Single characters
-        if ch in '{}()[],=+-*/%&|^~!<>?:.':
-            kind = 'brace' if ch in '{}' else ('paren' if ch in '()' else ('bracket' if ch in '[]' else ('comma' if ch == ',' else ('assign' if ch == '=' else 'op'))))
-            tokens.append(Token(kind, ch))
-            i += 1
-            continue
-        # Fallback: treat as op
-        tokens.append(Token('op', ch))
-        i += 1
+        text = m.group()
+        # Unknown characters ('other') fall back to op, like any other operator
+        kind = _SINGLE_KIND[text] if group == 'op1' else _GROUP_KIND[group]
+        tokens.append(Token(kind, text))
     return tokens
 
 
 # --- AST Nodes ---
+# Nodes are frozen and hold children in tuples: parse_macro_replacement caches
+# and shares its results, so no caller may be able to change a tree.
 
-class Expr: ...
+class Expr:
+    __slots__ = ()
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class Number(Expr):
     text: str
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class String(Expr):
     text: str
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class Identifier(Expr):
     name: str
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class Unary(Expr):
     op: str
     expr: Expr
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class Binary(Expr):
     left: Expr
     op: str
     right: Expr
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class Call(Expr):
     func: Identifier
-    args: List[Expr]
+    args: Tuple[Expr, ...]
 
-@dataclass
+# Shared by every zero-argument Call
+_NO_ARGS: Tuple[Expr, ...] = ()
+
+@dataclass(frozen=True, slots=True)
 class InitItem:
     field: Optional[str]  # designated field or None
     value: Expr
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class CompoundLiteral(Expr):
     type_name: str
-    items: List[InitItem]
+    items: Tuple[InitItem, ...]
 
 
 # --- Parser ---
 
+# Binary operator precedence; anything missing is not a binary operator
+_PREC: Dict[str, int] = {
+    '||': 1,
+    '&&': 2,
+    '==': 3, '!=': 3,
+    '<': 4, '>': 4, '<=': 4, '>=': 4,
+    '+': 5, '-': 5,
+    '*': 6, '/': 6, '%': 6,
+}
+
+
 class Parser:
     def __init__(self, tokens: List[Token]):
         self.toks = tokens
+        self.n = len(tokens)
         self.i = 0
 
     def _peek(self, k: int = 0) -> Optional[Token]:
         j = self.i + k
-        return self.toks[j] if 0 <= j < len(self.toks) else None
+        return self.toks[j] if 0 <= j < self.n else None
 
-    def _eat(self, kind: Optional[str] = None, text: Optional[str] = None) -> Optional[Token]:
-        t = self._peek()
-        if not t:
+    def _eat(self, kind: Optional[TK] = None, text: Optional[str] = None) -> Optional[Token]:
+        # Inlined _peek(): this is the parser's innermost call
+        if self.i >= self.n:
             return None
+        t = self.toks[self.i]
         if kind is not None and t.kind != kind:
             return None
         if text is not None and t.text != text:
@@ -136,49 +154,49 @@ class Parser:
     def parse(self) -> Optional[Expr]:
         # Special-case CLITERAL(Type){...}
         t0 = self._peek()
-        if t0 is not None and t0.kind == 'ident' and t0.text == 'CLITERAL':
+        if t0 is not None and t0.kind == TK.IDENT and t0.text == 'CLITERAL':
             return self._parse_cliteral()
         # Compound literal forms
         t0 = self._peek()
-        if t0 is not None and t0.kind == 'paren' and t0.text == '(':
+        if t0 is not None and t0.kind == TK.PAREN and t0.text == '(':
             # (Type){...}
             save = self.i
-            self._eat('paren', '(')
-            type_id = self._eat('ident')
-            if type_id is not None and self._eat('paren', ')') and self._eat('brace', '{'):
+            self._eat(TK.PAREN, '(')
+            type_id = self._eat(TK.IDENT)
+            if type_id is not None and self._eat(TK.PAREN, ')') and self._eat(TK.BRACE, '{'):
                 items = self._parse_init_list()
-                if self._eat('brace', '}'):
+                if self._eat(TK.BRACE, '}'):
                     return CompoundLiteral(type_id.text, items)
             self.i = save
         # Type{...}
         t0 = self._peek()
-        if t0 is not None and t0.kind == 'ident':
+        if t0 is not None and t0.kind == TK.IDENT:
             save = self.i
-            type_id = self._eat('ident')
-            if type_id is not None and self._eat('brace', '{'):
+            type_id = self._eat(TK.IDENT)
+            if type_id is not None and self._eat(TK.BRACE, '{'):
                 items = self._parse_init_list()
-                if self._eat('brace', '}'):
+                if self._eat(TK.BRACE, '}'):
                     return CompoundLiteral(type_id.text, items)
             self.i = save
         # Generic expression
         return self._parse_expr()
 
     def _parse_cliteral(self) -> Optional[Expr]:
-        if not (self._eat('ident', 'CLITERAL') and self._eat('paren', '(')):
+        if not (self._eat(TK.IDENT, 'CLITERAL') and self._eat(TK.PAREN, '(')):
             return None
-        type_id = self._eat('ident')
+        type_id = self._eat(TK.IDENT)
         if not type_id:
             return None
-        if not self._eat('paren', ')'):
+        if not self._eat(TK.PAREN, ')'):
             return None
-        if not self._eat('brace', '{'):
+        if not self._eat(TK.BRACE, '{'):
             return None
         items = self._parse_init_list()
-        if not self._eat('brace', '}'):
+        if not self._eat(TK.BRACE, '}'):
             return None
         return CompoundLiteral(type_id.text, items)
 
-    def _parse_init_list(self) -> List[InitItem]:
+    def _parse_init_list(self) -> Tuple[InitItem, ...]:
         items: List[InitItem] = []
         while True:
             # designated form: field = expr
@@ -186,18 +204,18 @@ class Parser:
             fld = None
             t0 = self._peek()
             t1 = self._peek(1)
-            if t0 is not None and t0.kind == 'ident' and t1 is not None and t1.kind == 'assign':
-                ident_tok = self._eat('ident')
+            if t0 is not None and t0.kind == TK.IDENT and t1 is not None and t1.kind == TK.ASSIGN:
+                ident_tok = self._eat(TK.IDENT)
                 fld = ident_tok.text if ident_tok is not None else None
-                self._eat('assign', '=')
+                self._eat(TK.ASSIGN, '=')
             expr = self._parse_expr()
             if expr is None:
                 self.i = save
                 break
             items.append(InitItem(field=fld, value=expr))
-            if not self._eat('comma', ','):
+            if not self._eat(TK.COMMA, ','):
                 break
-        return items
+        return tuple(items)
 
     # Very small Pratt parser for +,-,*,/ with parens and calls, identifiers, numbers, strings
     def _parse_expr(self, min_prec: int = 0) -> Optional[Expr]:
@@ -205,27 +223,29 @@ class Parser:
         if tok is None:
             return None
         # Primary
-        if tok.kind == 'number':
+        if tok.kind == TK.NUMBER:
             self._eat()
             left: Expr = Number(tok.text)
-        elif tok.kind == 'string':
+        elif tok.kind == TK.STRING:
             self._eat()
             left = String(tok.text)
-        elif tok.kind == 'ident':
-            ident = self._eat('ident')
+        elif tok.kind == TK.IDENT:
+            ident = self._eat(TK.IDENT)
             # call?
-            if self._eat('paren', '('):
-                args: List[Expr] = []
-                if not self._eat('paren', ')'):
+            if self._eat(TK.PAREN, '('):
+                args: Tuple[Expr, ...] = _NO_ARGS
+                if not self._eat(TK.PAREN, ')'):
+                    arg_list: List[Expr] = []
                     while True:
                         arg = self._parse_expr()
                         if arg is None:
                             break
-                        args.append(arg)
-                        if self._eat('paren', ')'):
+                        arg_list.append(arg)
+                        if self._eat(TK.PAREN, ')'):
                             break
-                        if not self._eat('comma', ','):
+                        if not self._eat(TK.COMMA, ','):
                             break
+                    args = tuple(arg_list)
                 if ident is None:
                     return None
                 left = Call(Identifier(ident.text), args)
@@ -233,35 +253,24 @@ class Parser:
                 if ident is None:
                     return None
                 left = Identifier(ident.text)
-        elif tok.kind == 'paren' and tok.text == '(':
-            self._eat('paren', '(')
+        elif tok.kind == TK.PAREN and tok.text == '(':
+            self._eat(TK.PAREN, '(')
             inner = self._parse_expr()
-            self._eat('paren', ')')
-            left = inner if inner else Identifier('')
+            self._eat(TK.PAREN, ')')
+            # Empty parens are not an expression
+            if inner is None:
+                return None
+            left = inner
         else:
             return None
 
         # Binary ops
-        prec_map = {
-            '||': 1,
-            '&&': 2,
-            '==': 3, '!=': 3,
-            '<': 4, '>': 4, '<=': 4, '>=': 4,
-            '+': 5, '-': 5,
-            '*': 6, '/': 6, '%': 6,
-        }
-
-        def get_prec(tok: Optional[Token]) -> int:
-            if tok and tok.kind in ('op',) and tok.text in prec_map:
-                return prec_map[tok.text]
-            return -1
-
         while True:
             op_tok = self._peek()
-            prec = get_prec(op_tok)
-            if prec < min_prec:
+            if op_tok is None or op_tok.kind != TK.OP:
                 break
-            if op_tok is None:
+            prec = _PREC.get(op_tok.text, -1)
+            if prec < min_prec:
                 break
             op = op_tok.text
             self._eat()
@@ -280,48 +289,78 @@ def _strip_float_suffix(num: str) -> str:
         return num[:-1]
     return num
 
+# Matches wherever the text holds something _expr_contains_float could call a float:
+# a decimal number carrying '.', 'e' or 'f' (1.5, 1., .5, 2e10, 3f) or a hex float
+# (0x1p3). Anchored at the start of a number, so hex digits like 0x1F and
+# identifiers like x1 never match. Identifiers are opaque to both, so a float
+# hidden behind another macro's name is missed by the walk just the same.
+_FLOAT_RE = re.compile(r'(?<!\w)(?:0[xX][\w.]*[pP]|(?!0[xX])\d\w*[.eEfF]|\.\d)')
+
 def _expr_contains_float(e: Expr) -> bool:
-    if isinstance(e, Number):
-        t = e.text
-        return ('f' in t.lower()) or ('.' in t) or ('e' in t.lower())
-    if isinstance(e, String):
-        return False
-    if isinstance(e, Identifier):
-        return False
-    if isinstance(e, Unary):
-        return _expr_contains_float(e.expr)
-    if isinstance(e, Binary):
-        return _expr_contains_float(e.left) or _expr_contains_float(e.right)
-    if isinstance(e, Call):
-        return False
-    if isinstance(e, CompoundLiteral):
-        return False
+    # Only numbers reachable through unary/binary arithmetic decide the type
+    work: List[Expr] = [e]
+    while work:
+        node = work.pop()
+        if isinstance(node, Number):
+            t = node.text.lower()
+            if t.startswith('0x'):
+                # Hex digits include e and f; only a binary exponent makes a hex float
+                if 'p' in t:
+                    return True
+            elif 'f' in t or '.' in t or 'e' in t:
+                return True
+        elif isinstance(node, Unary):
+            work.append(node.expr)
+        elif isinstance(node, Binary):
+            work.append(node.right)
+            work.append(node.left)
     return False
 
 def render_expr(e: Expr) -> str:
-    if isinstance(e, Number):
-        return _strip_float_suffix(e.text)
-    if isinstance(e, String):
-        return f"{e.text}.ref()"
-    if isinstance(e, Identifier):
-        return e.name
-    if isinstance(e, Unary):
-        return f"{e.op}{render_expr(e.expr)}"
-    if isinstance(e, Binary):
-        left = render_expr(e.left)
-        right = render_expr(e.right)
-        return f"({left}{e.op}{right})"
-    if isinstance(e, Call):
-        args = ','.join(render_expr(a) for a in e.args)
-        return f"{e.func.name}({args})"
-    if isinstance(e, CompoundLiteral):
-        # Fallback rendering without struct context
-        inner = ','.join((f"{it.field}=" if it.field else "") + render_expr(it.value) for it in e.items)
-        return f"{e.type_name}{{{inner}}}"
-    return "<unknown>"
+    # Iterative pre-order emit: plain strings on the stack are literal output,
+    # nodes are expanded in place with their children pushed in reverse.
+    out: List[str] = []
+    stack: List[Any] = [e]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, str):
+            out.append(node)
+        elif isinstance(node, Number):
+            out.append(_strip_float_suffix(node.text))
+        elif isinstance(node, String):
+            out.append(f"{node.text}.ref()")
+        elif isinstance(node, Identifier):
+            out.append(node.name)
+        elif isinstance(node, Unary):
+            out.append(node.op)
+            stack.append(node.expr)
+        elif isinstance(node, Binary):
+            out.append('(')
+            stack.extend((')', node.right, node.op, node.left))
+        elif isinstance(node, Call):
+            out.append(f"{node.func.name}(")
+            stack.append(')')
+            for i in range(len(node.args) - 1, -1, -1):
+                stack.append(node.args[i])
+                if i:
+                    stack.append(',')
+        elif isinstance(node, CompoundLiteral):
+            # Fallback rendering without struct context
+            out.append(f"{node.type_name}{{")
+            stack.append('}')
+            for i in range(len(node.items) - 1, -1, -1):
+                it = node.items[i]
+                stack.append(it.value)
+                if it.field:
+                    stack.append(f"{it.field}=")
+                if i:
+                    stack.append(',')
+        else:
+            out.append("<unknown>")
+    return ''.join(out)
 
 
-def render_constant(e: Expr, structs: Dict[str, Any], unions: Dict[str, Any]) -> Optional[Tuple[str, str]]:
+def render_constant(e: Expr, structs: Dict[str, Any], unions: Dict[str, Any], raw_text: Optional[str] = None) -> Optional[Tuple[str, str]]:
     # Skip identifiers and calls (aliases or function-like)
     if isinstance(e, Identifier):
         return None
@@ -334,7 +373,14 @@ def render_constant(e: Expr, structs: Dict[str, Any], unions: Dict[str, Any]) ->
 
     # Numbers or arithmetic
     if isinstance(e, (Number, Unary, Binary)):
-        ctype = 'f32' if _expr_contains_float(e) else 'i32'
+        # No float literal anywhere in the source text means none in the tree, so
+        # the walk is only needed when the text has one (possibly in call args or
+        # leftover text the parser never reached, which must not count)
+        if raw_text is not None and not _FLOAT_RE.search(raw_text):
+            is_float = False
+        else:
+            is_float = _expr_contains_float(e)
+        ctype = 'f32' if is_float else 'i32'
         return (ctype, render_expr(e))
 
     # Compound literal mapped through struct info
@@ -363,6 +409,7 @@ def render_constant(e: Expr, structs: Dict[str, Any], unions: Dict[str, Any]) ->
     return None
 
 
+@lru_cache(maxsize=4096)
 def parse_macro_replacement(text: str) -> Optional[Expr]:
     toks = tokenize(text)
     p = Parser(toks)
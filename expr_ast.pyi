@@ -1,60 +1,74 @@
 from _typeshed import Incomplete
 from dataclasses import dataclass
+from enum import IntEnum
 from typing import Any
 
-@dataclass
+class TK(IntEnum):
+    IDENT = 0
+    NUMBER = 1
+    STRING = 2
+    OP = 3
+    PAREN = 4
+    BRACE = 5
+    BRACKET = 6
+    COMMA = 7
+    ASSIGN = 8
+
+@dataclass(slots=True)
 class Token:
-    kind: str
+    kind: TK
     text: str
 
 def tokenize(src: str) -> list[Token]: ...
 
-class Expr: ...
+class Expr:
+    __slots__ = ()
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class Number(Expr):
     text: str
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class String(Expr):
     text: str
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class Identifier(Expr):
     name: str
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class Unary(Expr):
     op: str
     expr: Expr
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class Binary(Expr):
     left: Expr
     op: str
     right: Expr
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class Call(Expr):
     func: Identifier
-    args: list[Expr]
+    args: tuple[Expr, ...]
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class InitItem:
     field: str | None
     value: Expr
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class CompoundLiteral(Expr):
     type_name: str
-    items: list[InitItem]
+    items: tuple[InitItem, ...]
 
 class Parser:
     toks: Incomplete
+    n: int
     i: int
     def __init__(self, tokens: list[Token]) -> None: ...
     def parse(self) -> Expr | None: ...
 
 def render_expr(e: Expr) -> str: ...
-def render_constant(e: Expr, structs: dict[str, Any], unions: dict[str, Any]) -> tuple[str, str] | None: ...
+def render_constant(e: Expr, structs: dict[str, Any], unions: dict[str, Any], raw_text: str | None = None) -> tuple[str, str] | None: ...
 def parse_macro_replacement(text: str) -> Expr | None: ...
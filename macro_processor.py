@@ -1,17 +1,83 @@
-from typing import Optional, List, Dict, Any
+import logging
+import re
+from typing import Optional, List, Dict, Any, Tuple
 from expr_ast import parse_macro_replacement, render_constant
 from clang.cindex import Index, TranslationUnit, CursorKind, TypeKind
+from system_headers import SYSTEM_HEADER_DIRS, is_system_header
+
+log = logging.getLogger("naturebindgen")
+
+# Leading struct name of a rendered initializer such as Color{...}
+_VAL_STRUCT = re.compile(r"^(\w+)\s*\{")
+
+
+# Punctuator characters that can glue onto a neighbour into a longer token (- -1 -> --1, / * -> /*)
+_GLUING_PUNCT = frozenset('+-*/%&|^<>=!')
+
+
+def _join_spellings(spellings: List[str]) -> str:
+    """Concatenates token spellings, keeping a space only where the tokens would otherwise re-lex differently."""
+    parts: List[str] = []
+    prev = ''
+    for sp in spellings:
+        if prev and sp and (
+            ((prev[-1].isalnum() or prev[-1] == '_') and (sp[0].isalnum() or sp[0] == '_'))
+            or (prev[-1] in _GLUING_PUNCT and sp[0] in _GLUING_PUNCT)
+        ):
+            parts.append(' ')
+        parts.append(sp)
+        prev = sp
+    return ''.join(parts)
+
 
 class MacroProcessor:
-    def __init__(self, structs: Dict[str, Any], unions: Dict[str, Any]):
+    # Canonical C kinds that map straight onto Nature primitives
+    _BASIC_MAP = {
+        TypeKind.VOID: "void",
+        TypeKind.BOOL: "bool",
+        TypeKind.CHAR_S: "i8",
+        TypeKind.SCHAR: "i8",
+        TypeKind.UCHAR: "u8",
+        TypeKind.SHORT: "i16",
+        TypeKind.USHORT: "u16",
+        TypeKind.INT: "i32",
+        TypeKind.UINT: "u32",
+        TypeKind.LONG: "i64",
+        TypeKind.ULONG: "u64",
+        TypeKind.LONGLONG: "i64",
+        TypeKind.ULONGLONG: "u64",
+        TypeKind.FLOAT: "f32",
+        TypeKind.DOUBLE: "f64",
+        TypeKind.LONGDOUBLE: "f64",
+    }
+
+    def __init__(self, structs: Dict[str, Any], unions: Dict[str, Any], system_dirs: Optional[Tuple[str, ...]] = None):
         self.structs = structs
         self.unions = unions
+        self.system_dirs = tuple(system_dirs) if system_dirs is not None else SYSTEM_HEADER_DIRS
+        self._type_cache: Dict[Tuple[int, str], str] = {}  # (TypeKind value, spelling) -> Nature type
+        self._index = Index.create()
+        # (is_union, record name) -> field names; filled lazily since records arrive after construction
+        self._field_name_cache: Dict[Tuple[bool, str], Tuple[str, ...]] = {}
+
+    def clear_type_cache(self) -> None:
+        """Drops memoized type mappings; record types map differently once the record is known."""
+        self._type_cache.clear()
 
     def _map_c_type_to_nature(self, c_type) -> str:
-        """Lightweight C type to Nature type mapping for macros."""
+        """Lightweight C type to Nature type mapping for macros, memoized by (kind, spelling)."""
         if c_type is None:
             return "any"
 
+        # A RECORD and an ELABORATED type can share a spelling but map differently
+        key = (c_type.kind.value, c_type.spelling)
+        mapped = self._type_cache.get(key)
+        if mapped is None:
+            mapped = self._map_uncached_type(c_type)
+            self._type_cache[key] = mapped
+        return mapped
+
+    def _map_uncached_type(self, c_type) -> str:
         kind = c_type.kind
         spelling = c_type.spelling.replace("const ", "").strip()
 
@@ -44,99 +110,115 @@ class MacroProcessor:
         canon = c_type.get_canonical()
         canon_sp = canon.spelling.replace("const ", "").strip()
 
-        basic_map = {
-            TypeKind.VOID: "void",
-            TypeKind.BOOL: "bool",
-            TypeKind.CHAR_S: "i8",
-            TypeKind.SCHAR: "i8",
-            TypeKind.UCHAR: "u8",
-            TypeKind.SHORT: "i16",
-            TypeKind.USHORT: "u16",
-            TypeKind.INT: "i32",
-            TypeKind.UINT: "u32",
-            TypeKind.LONG: "i64",
-            TypeKind.ULONG: "u64",
-            TypeKind.LONGLONG: "i64",
-            TypeKind.ULONGLONG: "u64",
-            TypeKind.FLOAT: "f32",
-            TypeKind.DOUBLE: "f64",
-            TypeKind.LONGDOUBLE: "f64",
-        }
-        if canon.kind in basic_map:
-            return basic_map[canon.kind]
+        if canon.kind in self._BASIC_MAP:
+            return self._BASIC_MAP[canon.kind]
 
         # Fallbacks
         if spelling:
             return spelling
         return "any"
 
+    def _field_names(self, record_name: str, is_union: bool) -> Tuple[str, ...]:
+        """Field names of a known struct or union, built once per record."""
+        key = (is_union, record_name)
+        names = self._field_name_cache.get(key)
+        if names is None:
+            record = (self.unions if is_union else self.structs)[record_name]
+            names = self._field_name_cache[key] = tuple(f.name for f in record.fields)
+        return names
+
+    @staticmethod
+    def _first_token_spelling(expr, default: str) -> str:
+        """Spelling of the first token of expr, without materializing the rest."""
+        first = next(iter(expr.get_tokens()), None)
+        return first.spelling if first is not None else default
+
     def _expr_to_str(self, expr) -> str:
         """Convert a clang expression to a string value."""
-        if expr.kind == CursorKind.INTEGER_LITERAL:
-            # Get the tokens to get the exact literal text
-            tokens = list(expr.get_tokens())
-            if tokens:
-                return tokens[0].spelling
-            return "0"  # Fallback
+        kind = expr.kind
+        if kind == CursorKind.INTEGER_LITERAL:
+            # Get the first token to get the exact literal text
+            return self._first_token_spelling(expr, "0")
         
-        elif expr.kind == CursorKind.FLOATING_LITERAL:
-            tokens = list(expr.get_tokens())
-            if tokens:
-                return tokens[0].spelling
-            return "0.0"  # Fallback
+        elif kind == CursorKind.FLOATING_LITERAL:
+            return self._first_token_spelling(expr, "0.0")
         
-        elif expr.kind == CursorKind.STRING_LITERAL:
+        elif kind == CursorKind.STRING_LITERAL:
             # Handle string literals with proper escaping
             return f'"{expr.spelling}".ref()'
         
-        elif expr.kind in (CursorKind.UNEXPOSED_EXPR, CursorKind.COMPOUND_LITERAL_EXPR) and any(c.kind == CursorKind.INIT_LIST_EXPR for c in expr.get_children()):
-            # Handle compound literals (structs/unions)
-            type_decl = expr.type.get_declaration() if expr.type else None
-            if type_decl and type_decl.kind == CursorKind.STRUCT_DECL:
-                struct_name = type_decl.spelling
-                if struct_name in self.structs:
-                    struct = self.structs[struct_name]
-                    init_children = list(expr.get_children())[0].get_children() if expr.kind == CursorKind.UNEXPOSED_EXPR else list(expr.get_children())
-                    fields = []
-                    for i, field in enumerate(struct.fields):
-                        try:
-                            init = list(init_children)[i]
-                            fields.append(f"{field.name}={self._expr_to_str(init)}")
-                        except Exception:
-                            break
-                    return f"{struct_name}{{{', '.join(fields)}}}"
-            elif type_decl and type_decl.kind == CursorKind.UNION_DECL:
-                union_name = type_decl.spelling
-                if union_name in self.unions:
-                    union = self.unions[union_name]
-                    # For unions, we only use the first field's initialization
-                    init_children = list(expr.get_children())[0].get_children() if expr.kind == CursorKind.UNEXPOSED_EXPR else list(expr.get_children())
-                    if init_children:
-                        field = union.fields[0]
-                        return f"{union.name}{{{field.name}={self._expr_to_str(init_children[0])}}}"
-        
+        elif kind in (CursorKind.UNEXPOSED_EXPR, CursorKind.COMPOUND_LITERAL_EXPR):
+            children = list(expr.get_children())
+            if any(c.kind == CursorKind.INIT_LIST_EXPR for c in children):
+                # Handle compound literals (structs/unions)
+                type_decl = expr.type.get_declaration() if expr.type else None
+                init_children = list(children[0].get_children()) if kind == CursorKind.UNEXPOSED_EXPR else children
+                if type_decl and type_decl.kind == CursorKind.STRUCT_DECL:
+                    struct_name = type_decl.spelling
+                    if struct_name in self.structs:
+                        fields = [
+                            f"{field_name}={self._expr_to_str(init)}"
+                            for field_name, init in zip(self._field_names(struct_name, is_union=False), init_children)
+                        ]
+                        return f"{struct_name}{{{', '.join(fields)}}}"
+                elif type_decl and type_decl.kind == CursorKind.UNION_DECL:
+                    union_name = type_decl.spelling
+                    if union_name in self.unions:
+                        union = self.unions[union_name]
+                        # For unions, we only use the first field's initialization
+                        if init_children:
+                            field_name = self._field_names(union_name, is_union=True)[0]
+                            return f"{union.name}{{{field_name}={self._expr_to_str(init_children[0])}}}"
+
         # Fallback: get the raw text
-        tokens = list(expr.get_tokens())
-        if tokens:
-            return " ".join(t.spelling for t in tokens)
+        spellings = [t.spelling for t in expr.get_tokens()]
+        if spellings:
+            return _join_spellings(spellings)
         return "<unknown>"
 
-    def process_macro(self, header_path: str, define_name: str, clang_args: Optional[List[str]] = None) -> Optional[str]:
+    def process_macro(self, header_path: str, define_name: str, clang_args: Optional[List[str]] = None,
+                      main_header: Optional[str] = None) -> Optional[str]:
         """Process a macro definition using Python-side type information."""
+        return self.process_macros(header_path, [define_name], clang_args, main_header).get(define_name)
+
+    def process_macros(self, header_path: str, define_names: List[str], clang_args: Optional[List[str]] = None,
+                       main_header: Optional[str] = None) -> Dict[str, str]:
+        """
+        Evaluates several macros from the same header in one translation unit.
+
+        Returns a mapping of macro name to its "<type> <name> = <value>;" line for
+        every macro that could be resolved. main_header is the header being bound;
+        it is never treated as a system header, wherever it is installed.
+        """
         # Skip system headers
-        if header_path.startswith('<') and header_path.endswith('>'):
-            print(f"DEBUG: Skipping system header: {header_path}")
-            return None
+        if (header_path.startswith('<') and header_path.endswith('>')) or \
+                is_system_header(header_path, self.system_dirs, main_header):
+            log.debug("Skipping system header: %s", header_path)
+            return {}
 
-        # Generate code to evaluate the macro
-        code = (
-            f'#include "{header_path}"\n'
-            f'static const __typeof__({define_name}) __dummy_var = {define_name};\n'
+        names = list(dict.fromkeys(define_names))
+        results, missing = self._evaluate_macros(header_path, names, clang_args)
+        # A malformed expansion can take neighbouring declarations down with it,
+        # so retry anything the batch lost in its own translation unit
+        if len(names) > 1:
+            for name in missing:
+                results.update(self._evaluate_macros(header_path, [name], clang_args)[0])
+        return results
+
+    def _evaluate_macros(self, header_path: str, define_names: List[str], clang_args: Optional[List[str]]) -> Tuple[Dict[str, str], List[str]]:
+        """Parses one TU declaring a dummy variable per macro; returns results and names never found."""
+        if not define_names:
+            return {}, []
+
+        # Generate code to evaluate the macros
+        code = ''.join(
+            [f'#include "{header_path}"\n'] +
+            [f'static const __typeof__({name}) __dummy_{name} = {name};\n' for name in define_names]
         )
-        print(f"DEBUG: Generated code:\n{code}")
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug("Generated code:\n%s", code)
 
         # Parse the code
-        index = Index.create()
         args = ['-x', 'c', '-std=c11'] + (clang_args or [])
         
         # Add include path for the header's directory
@@ -144,76 +226,93 @@ class MacroProcessor:
             header_dir = header_path.rsplit('/', 1)[0]
             args.append(f'-I{header_dir}')
 
-        print(f"DEBUG: MacroProcessor.parse args: {args}")
-        tu = index.parse('tmp.c', args=args, unsaved_files=[('tmp.c', code)])
+        log.debug("MacroProcessor.parse args: %s", args)
+        # Only declarations matter here; skip bodies of inline functions in the header
+        tu = self._index.parse('tmp.c', args=args, unsaved_files=[('tmp.c', code)],
+                               options=TranslationUnit.PARSE_SKIP_FUNCTION_BODIES)
         if not tu:
-            print("DEBUG: Failed to parse translation unit")
-            return None
+            log.debug("Failed to parse translation unit")
+            return {}, list(define_names)
 
-        # Find our dummy variable
+        # Find our dummy variables
+        pending = {f'__dummy_{name}': name for name in define_names}
+        results: Dict[str, str] = {}
         for cursor in tu.cursor.get_children():
-            if (cursor.kind == CursorKind.VAR_DECL and 
-                cursor.spelling == '__dummy_var' and 
-                cursor.location.file and 
-                str(cursor.location.file) == 'tmp.c'):
-                print(f"DEBUG: Found __dummy_var: type='{cursor.type.spelling if cursor.type else None}'")
-                
-                if not cursor.type:
-                    print("DEBUG: No type information for macro value")
-                    return None
-
-                type_name = self._map_c_type_to_nature(cursor.type)
-
-                if not type_name:
-                    print(f"DEBUG: Could not determine type for {define_name}")
-                    return None
-
-                # Reconstruct RHS text from tokens for robust parsing
-                tok_list = list(cursor.get_tokens())
-                print(f"DEBUG: VAR_DECL tokens: {[t.spelling for t in tok_list]}")
-                eq_index = -1
-                for i, t in enumerate(tok_list):
-                    if t.spelling == '=':
-                        eq_index = i
-                        break
-                rhs_text = ''
-                if eq_index != -1:
-                    expr_tokens = tok_list[eq_index + 1:]
-                    if expr_tokens and expr_tokens[-1].spelling == ';':
-                        expr_tokens = expr_tokens[:-1]
-                    rhs_text = ''.join(t.spelling for t in expr_tokens).strip()
-                # If there's no RHS at all (header guards etc.), skip
-                if not rhs_text:
-                    return None
-
-                # Prefer AST child initializer if present
-                children = list(cursor.get_children())
-                if children:
-                    value = self._expr_to_str(children[0])
-                    print(f"DEBUG: Initializer child expr -> '{value}' from kind={children[0].kind}")
-                else:
-                    value = rhs_text
-                    print(f"DEBUG: Initializer from RHS text -> '{value}'")
-
-                # Try robust parsing via lightweight AST
-                expr = parse_macro_replacement(rhs_text)
-                if expr is not None:
-                    rendered = render_constant(expr, self.structs, self.unions)
-                    if rendered is not None:
-                        type_name, value = rendered
-
-                # Normalize string literal to Nature pointer form
-                if isinstance(value, str) and value.startswith('"') and value.endswith('"'):
-                    value = f'{value}.ref()'
-                    type_name = 'anyptr'
-
-                # If the value looks like Struct{...}, ensure type_name matches
-                if isinstance(value, str):
-                    m3 = _re.match(r"^(\w+)\s*\{", value)
-                    if m3 and m3.group(1) in self.structs:
-                        type_name = m3.group(1)
-
-                return f"{type_name} {define_name} = {value};"
-
-        print("DEBUG: Could not find macro value")
-        return None
+            if cursor.kind != CursorKind.VAR_DECL:
+                continue
+            define_name = pending.get(cursor.spelling)
+            if define_name is None or not cursor.location.file or str(cursor.location.file) != 'tmp.c':
+                continue
+            del pending[cursor.spelling]
+            result = self._evaluate_dummy_var(cursor, define_name)
+            if result:
+                results[define_name] = result
+            if not pending:
+                break
+
+        for define_name in pending.values():
+            log.debug("Could not find macro value for %s", define_name)
+        return results, list(pending.values())
+
+    def _evaluate_dummy_var(self, cursor, define_name: str) -> Optional[str]:
+        """Builds the constant line for one macro from its dummy VAR_DECL."""
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug("Found %s: type='%s'", cursor.spelling, cursor.type.spelling if cursor.type else None)
+        
+        if not cursor.type:
+            log.debug("No type information for macro value")
+            return None
+
+        type_name = self._map_c_type_to_nature(cursor.type)
+
+        if not type_name:
+            log.debug("Could not determine type for %s", define_name)
+            return None
+
+        # Reconstruct RHS text from tokens for robust parsing
+        tok_list = list(cursor.get_tokens())
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug("VAR_DECL tokens: %s", [t.spelling for t in tok_list])
+        eq_index = -1
+        for i, t in enumerate(tok_list):
+            if t.spelling == '=':
+                eq_index = i
+                break
+        rhs_text = ''
+        if eq_index != -1:
+            expr_tokens = tok_list[eq_index + 1:]
+            if expr_tokens and expr_tokens[-1].spelling == ';':
+                expr_tokens = expr_tokens[:-1]
+            rhs_text = ''.join(t.spelling for t in expr_tokens).strip()
+        # If there's no RHS at all (header guards etc.), skip
+        if not rhs_text:
+            return None
+
+        # Prefer AST child initializer if present
+        children = list(cursor.get_children())
+        if children:
+            value = self._expr_to_str(children[0])
+            log.debug("Initializer child expr -> '%s' from kind=%s", value, children[0].kind)
+        else:
+            value = rhs_text
+            log.debug("Initializer from RHS text -> '%s'", value)
+
+        # Try robust parsing via lightweight AST
+        expr = parse_macro_replacement(rhs_text)
+        if expr is not None:
+            rendered = render_constant(expr, self.structs, self.unions, raw_text=rhs_text)
+            if rendered is not None:
+                type_name, value = rendered
+
+        # Normalize string literal to Nature pointer form
+        if isinstance(value, str) and value.startswith('"') and value.endswith('"'):
+            value = f'{value}.ref()'
+            type_name = 'anyptr'
+
+        # If the value looks like Struct{...}, ensure type_name matches
+        if isinstance(value, str):
+            m3 = _VAL_STRUCT.match(value)
+            if m3 and m3.group(1) in self.structs:
+                type_name = m3.group(1)
+
+        return f"{type_name} {define_name} = {value};"
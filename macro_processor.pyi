@@ -5,5 +5,8 @@ from typing import Any
 class MacroProcessor:
     structs: Incomplete
     unions: Incomplete
-    def __init__(self, structs: dict[str, Any], unions: dict[str, Any]) -> None: ...
-    def process_macro(self, header_path: str, define_name: str, clang_args: list[str] | None = None) -> str | None: ...
+    system_dirs: tuple[str, ...]
+    def __init__(self, structs: dict[str, Any], unions: dict[str, Any], system_dirs: tuple[str, ...] | None = None) -> None: ...
+    def clear_type_cache(self) -> None: ...
+    def process_macro(self, header_path: str, define_name: str, clang_args: list[str] | None = None, main_header: str | None = None) -> str | None: ...
+    def process_macros(self, header_path: str, define_names: list[str], clang_args: list[str] | None = None, main_header: str | None = None) -> dict[str, str]: ...
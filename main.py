@@ -1,11 +1,15 @@
 #!/usr/bin/env python3
 import argparse
+import logging
 import os
 import re
 import sys
+from functools import lru_cache
+from itertools import chain
+from operator import attrgetter
 from num2words import num2words
 from textwrap import dedent
-from typing import Dict, List, Optional, Set
+from typing import Dict, List, Optional, Set, Tuple
 
 # Ensure libclang and num2words are installed:
 # pip install libclang num2words
@@ -17,11 +21,111 @@ if os.name == "posix":
 else:
     Config.set_library_file(os.getenv("LIBCLANG_PATH") or "")
 
+from macro_processor import MacroProcessor
+from system_headers import is_system_header
 from out_types import (
     Constant, Parameter, Function, StructField, Struct,
     Union, EnumMember, Enum, UnnamedObject
 )
 
+log = logging.getLogger("naturebindgen")
+
+# Location part of clang's unnamed record spelling, e.g. "(unnamed at file.h:31:5)"
+_UNNAMED_RE = re.compile(r'at ([^:]+):(\d+):(\d+)')
+# Struct initializers: "Type{...}" / "struct Type{...}" and "(Type){...}"
+_STRUCT_INIT_RE = re.compile(r"^(?:struct\s+)?(\w+)\s*\{([\s\S]*)\}$")
+_DESIGNATED_CAST_RE = re.compile(r"^\(\s*(?:struct\s+)?(\w+)\s*\)\s*\{([\s\S]*)\}$")
+# Raylib-style CLITERAL(Type){...} compound literals
+_CLITERAL_RE = re.compile(r"^CLITERAL\s*\(\s*(?:struct\s+)?(\w+)\s*\)\s*\{([\s\S]*)\}$")
+_IDENT_RE = re.compile(r"[A-Za-z_]\w*")
+# 'f' suffix on a numeric literal, e.g. 1.5f
+_FLOAT_SUFFIX_RE = re.compile(r"(?<=\d)f\b")
+# MacroProcessor result lines: "<type> <name> = <value>;"; the type may contain spaces
+_MACRO_RESULT_RE = re.compile(r"^\s*(.+?)\s+(\S+?)\s*=\s*(.*?)\s*;?\s*$", re.DOTALL)
+# Unresolved "typeof(T)" constant types
+_TYPEOF_RE = re.compile(r"^typeof\((\w+)\)$")
+# Delimiters _split_top_level cares about; escapes are matched whole so quotes inside literals are skipped
+_SPLIT_RE = re.compile(r"""\\.|[{}()"',]""")
+
+# Constructor emitted for 4- and 8-byte unions, writing a typed value into the byte array
+_UNION_CTOR_TMPL = (
+    "\n"
+    "fn new{name}<T>(T value):{name} {{\n"
+    "    u8 zero = 0 as u8\n"
+    "    {name} result = [{zeros}]\n"
+    "    result as anyptr as rawptr<T> as T = value\n"
+    "    return result\n"
+    "}}"
+)
+_UNION_CTOR_ZEROS = {size: ",".join(["zero"] * size) for size in (4, 8)}
+
+# Builtin scalar kinds; their spelling is already canonical
+_BUILTIN_TYPE_KINDS = frozenset(kind.value for kind in (
+    TypeKind.VOID, TypeKind.BOOL,
+    TypeKind.CHAR_U, TypeKind.UCHAR, TypeKind.USHORT, TypeKind.UINT,
+    TypeKind.ULONG, TypeKind.ULONGLONG, TypeKind.CHAR_S, TypeKind.SCHAR,
+    TypeKind.SHORT, TypeKind.INT, TypeKind.LONG, TypeKind.LONGLONG,
+    TypeKind.FLOAT, TypeKind.DOUBLE, TypeKind.LONGDOUBLE,
+))
+# Type kinds whose mapping depends only on the spelling, never on records seen so far
+_CACHEABLE_TYPE_KINDS = _BUILTIN_TYPE_KINDS | {TypeKind.POINTER.value}
+
+
+def _strip_const(spelling: str) -> str:
+    """Drops a leading 'const ' qualifier; clang always spells it first."""
+    return spelling[6:] if spelling.startswith("const ") else spelling
+
+
+def _strip_struct_union(spelling: str) -> str:
+    """Drops a leading 'struct '/'union ' tag keyword."""
+    return spelling.removeprefix("struct ").removeprefix("union ")
+
+
+def _strip_outer_parens(s: str) -> str:
+    """Drops one pair of parens wrapping the whole expression, e.g. '(1+2)' but not '(1)+(2)'."""
+    if s.startswith('(') and s.endswith(')'):
+        # simple balance check
+        depth=0
+        for i,ch in enumerate(s):
+            if ch=='(':
+                depth+=1
+            elif ch==')':
+                depth-=1
+                if depth==0 and i!=len(s)-1:
+                    return s
+        return s[1:-1]
+    return s
+
+
+@lru_cache(maxsize=None)
+def _union_type_name(size: int) -> str:
+    """Size-based union type name, e.g. 24 -> 'Union_twenty_four_bytes'."""
+    words = num2words(size).replace("-", "_").replace(" ", "_").replace(",", "")
+    return f"Union_{words}_bytes"
+
+
+@lru_cache(maxsize=4096)
+def _parse_unnamed_spelling(spelling: str) -> Optional[UnnamedObject]:
+    """Parses clang's unnamed-record spelling; pure, so results are shared across calls."""
+    if "unnamed" not in spelling and "anonymous" not in spelling:
+        return None
+
+    # Handle patterns like:
+    # "struct (unnamed at test_edge_cases.h:31:5)"
+    # "union (unnamed at test_edge_cases.h:57:5)"
+    # "(unnamed struct at test_edge_cases.h:31:5)"
+    # "(unnamed union at test_edge_cases.h:57:5)"
+
+    is_union = "union" in spelling
+
+    # Extract file and location
+    match = _UNNAMED_RE.search(spelling)
+    if match:
+        file = match.group(1)
+        location = f"{match.group(2)}:{match.group(3)}"
+        return UnnamedObject(is_union=is_union, file=file, location=location)
+    return None
+
 # --- Core Binding Generator ---
 
 class BindingGenerator:
@@ -40,38 +144,48 @@ class BindingGenerator:
         self.union_sizes: Dict[str, int] = {}  # Maps union names to their sizes
         self.clang_to_contextual: Dict[UnnamedObject, str] = {}  # Maps raw clang spelling to contextual names
 
-        self._processed_cursors: Set[Cursor] = set()
+        self._processed_cursors: Set[int] = set()  # cursor.hash of every visited cursor
         self._anon_type_map: Dict[str, str] = {} # Maps Clang anonymous names to our generated ones
+        self._unnamed_mapping_cache: Dict[str, Optional[str]] = {}  # Type spelling -> _get_unnamed_object_mapping result
+        self._type_cache: Dict[Tuple[int, str], str] = {}  # (TypeKind value, spelling) -> Nature type
+        # Same, for kinds that resolve through records/typedefs; cleared whenever those change
+        self._dependent_type_cache: Dict[Tuple[int, str], str] = {}
+        self._contextual_name_cache: Dict[Tuple[int, str], str] = {}  # (cursor.hash, prefix) -> contextual name
+        self._union_by_name: Optional[Dict[str, Union]] = None  # Union.name -> first such union; rebuilt on demand
         self._queued_macros: List[tuple[Cursor, str, List[str], bool]] = []
-
-        self.reserved_keywords: Set[str] = {"type", "ptr"}
+        self._seen_macro = False
+        self._clang_args: List[str] = []  # Extra clang arguments of the header being parsed
+
+        self._kind_handlers = {
+            CursorKind.STRUCT_DECL: lambda c: self._handle_struct_or_union(c, is_union=False),
+            CursorKind.UNION_DECL: lambda c: self._handle_struct_or_union(c, is_union=True),
+            CursorKind.ENUM_DECL: self._handle_enum,
+            CursorKind.FUNCTION_DECL: self._handle_function,
+            CursorKind.TYPEDEF_DECL: self._handle_typedef,
+            CursorKind.MACRO_DEFINITION: self._queue_macro,
+        }
+        self._deferred_macros: Dict[str, List[str]] = {}  # Header path -> macros left for MacroProcessor
+        # Shares the struct/union dicts, so it sees records as they are added
+        self._macro_processor = MacroProcessor(self.structs, self.unions)
+        self._main_header: Optional[str] = None  # clang's spelling of the header being bound
+
+        self.reserved_keywords: frozenset[str] = frozenset({"type", "ptr"})
+        self._sanitize_cache: Dict[str, str] = {}
 
         self._initialize_type_mappings()
 
     def _parse_unnamed_object(self, spelling: str) -> Optional[UnnamedObject]:
         """Parse clang spelling to extract unnamed object information."""
-        if not spelling or ("unnamed" not in spelling and "anonymous" not in spelling):
-            print(f"DEBUG: Failed to parse unnamed object: {spelling}")
-            return None
-
-        # Handle patterns like:
-        # "struct (unnamed at test_edge_cases.h:31:5)"
-        # "union (unnamed at test_edge_cases.h:57:5)"
-        # "(unnamed struct at test_edge_cases.h:31:5)"
-        # "(unnamed union at test_edge_cases.h:57:5)"
+        unnamed_obj = _parse_unnamed_spelling(spelling) if spelling else None
+        if unnamed_obj is None:
+            log.debug("Failed to parse unnamed object: %s", spelling)
+        return unnamed_obj
 
-        is_union = "union" in spelling
-        is_struct = "struct" in spelling
-
-        # Extract file and location
-        match = re.search(r'at ([^:]+):(\d+):(\d+)', spelling)
-        if match:
-            file = match.group(1)
-            location = f"{match.group(2)}:{match.group(3)}"
-            return UnnamedObject(is_union=is_union, file=file, location=location)
-
-        print(f"DEBUG: Failed to parse unnamed object: {spelling}")
-        return None
+    def _store_unnamed_mapping(self, unnamed_obj: UnnamedObject, contextual_name: str):
+        """Records a contextual name for an unnamed object, dropping stale lookup results."""
+        self.clang_to_contextual[unnamed_obj] = contextual_name
+        self._unnamed_mapping_cache.clear()
+        self._dependent_type_cache.clear()
 
     def _get_unnamed_object_mapping(self, type_spelling: str) -> Optional[str]:
         """
@@ -86,32 +200,23 @@ class BindingGenerator:
         if not type_spelling or ("unnamed" not in type_spelling and "anonymous" not in type_spelling):
             return None
 
-        # Try direct mapping first
-        if type_spelling in self.clang_to_contextual:
-            unnamed_obj = self._parse_unnamed_object(type_spelling)
-            if unnamed_obj:
-                return self.clang_to_contextual[unnamed_obj]
+        cache = self._unnamed_mapping_cache
+        if type_spelling not in cache:
+            cache[type_spelling] = self._resolve_unnamed_object_mapping(type_spelling)
+        return cache[type_spelling]
 
-        # Try parsing as UnnamedObject and find matching mapping
+    def _resolve_unnamed_object_mapping(self, type_spelling: str) -> Optional[str]:
+        """Uncached lookup behind _get_unnamed_object_mapping."""
+        # UnnamedObject hashes on (is_union, file, location), so it is the key itself
         unnamed_obj = self._parse_unnamed_object(type_spelling)
         if unnamed_obj:
-            # Look for a mapping that matches this unnamed object
-            for clang_spelling, contextual_name in self.clang_to_contextual.items():
-                if isinstance(clang_spelling, UnnamedObject):  # Ensure we're comparing UnnamedObjects
-                    if (clang_spelling.is_union == unnamed_obj.is_union and
-                        clang_spelling.file == unnamed_obj.file and
-                        clang_spelling.location == unnamed_obj.location):
-                        return contextual_name
+            contextual_name = self.clang_to_contextual.get(unnamed_obj)
+            if contextual_name is not None:
+                return contextual_name
 
         # Check for struct/union prefix
-        if type_spelling.startswith("struct "):
-            result = self._get_unnamed_object_mapping(type_spelling[7:])
-            if result:
-                return result
-        elif type_spelling.startswith("union "):
-            result = self._get_unnamed_object_mapping(type_spelling[6:])
-            if result:
-                return result
+        if type_spelling.startswith(("struct ", "union ")):
+            return self._get_unnamed_object_mapping(type_spelling.partition(" ")[2])
 
         return None
 
@@ -141,11 +246,24 @@ class BindingGenerator:
 
     def _sanitize_name(self, name: str) -> str:
         """Appends an underscore to a name if it's a reserved keyword."""
-        return f"{name}_" if name in self.reserved_keywords else name
+        sanitized = self._sanitize_cache.get(name)
+        if sanitized is None:
+            sanitized = self._sanitize_cache[name] = f"{name}_" if name in self.reserved_keywords else name
+        return sanitized
 
     def _map_c_type_to_nature(self, c_type: Type) -> str:
         """Converts a clang Type object to a Nature language type string."""
-        type_spelling = c_type.spelling.replace("const ", "").strip()
+        kind_value = c_type.kind.value
+        cache = self._type_cache if kind_value in _CACHEABLE_TYPE_KINDS else self._dependent_type_cache
+        key = (kind_value, c_type.spelling)
+        nature_type = cache.get(key)
+        if nature_type is None:
+            nature_type = cache[key] = self._map_uncached_type(c_type)
+        return nature_type
+
+    def _map_uncached_type(self, c_type: Type) -> str:
+        """Uncached conversion behind _map_c_type_to_nature."""
+        type_spelling = _strip_const(c_type.spelling)
 
         # 1. Handle Pointers
         if c_type.kind == TypeKind.POINTER:
@@ -181,31 +299,35 @@ class BindingGenerator:
         if c_type.kind == TypeKind.RECORD:
             decl = c_type.get_declaration()
             record_name = decl.spelling
-            print(f"DEBUG: Record type found: '{record_name}' (kind: {c_type.kind})")
+            log.debug("Record type found: '%s' (kind: %s)", record_name, c_type.kind)
 
             # Check if this is an anonymous type we've processed
             if "anonymous" in record_name or "unnamed" in record_name or not record_name:
-                print(f"DEBUG: Anonymous type found: '{record_name}'")
+                log.debug("Anonymous type found: '%s'", record_name)
                 # Try to get the contextual name from our mapping
                 contextual_name = self._get_unnamed_object_mapping(record_name)
                 if contextual_name:
-                    print(f"DEBUG: Mapped '{record_name}' to '{contextual_name}'")
+                    log.debug("Mapped '%s' to '%s'", record_name, contextual_name)
                     return contextual_name
                 # Fallback to anon type map
                 return self._anon_type_map.get(record_name, record_name)
 
             # Remove "struct" prefix if present
-            if record_name.startswith("struct "):
-                record_name = record_name[7:]  # Remove "struct " prefix
-            return record_name
+            return record_name.removeprefix("struct ")
 
         # 5. Basic Types from our map
-        # Use canonical type for robustness (e.g., `long int` -> `long`)
-        canonical_spelling = c_type.get_canonical().spelling.replace("const ", "").strip()
-        if canonical_spelling in self.type_mappings:
-            return self.type_mappings[canonical_spelling]
-        if type_spelling in self.type_mappings:
-            return self.type_mappings[type_spelling]
+        if c_type.kind.value in _BUILTIN_TYPE_KINDS:
+            # Builtins are their own canonical type, so skip the libclang round trip
+            mapped_type = self.type_mappings.get(type_spelling)
+            if mapped_type is not None:
+                return mapped_type
+        else:
+            # Use canonical type for robustness (e.g., `long int` -> `long`)
+            canonical_spelling = _strip_const(c_type.get_canonical().spelling)
+            if canonical_spelling in self.type_mappings:
+                return self.type_mappings[canonical_spelling]
+            if type_spelling in self.type_mappings:
+                return self.type_mappings[type_spelling]
 
         # 6. Check typedefs for mapped types
         if type_spelling in self.typedefs:
@@ -213,12 +335,12 @@ class BindingGenerator:
             return mapped_type
 
         # 7. Remove "struct" and "union" prefixes for lookup
-        normalized_type = type_spelling.replace("struct ", "").replace("union ", "")
+        normalized_type = _strip_struct_union(type_spelling)
 
         # 8. Check if this is a union name we've seen
         if normalized_type in self.union_sizes:
             size = self.union_sizes[normalized_type]
-            return f"Union_{num2words(size)}_bytes"
+            return _union_type_name(size)
 
         # 9. Check if this is a known struct
         if normalized_type in self.structs:
@@ -227,9 +349,7 @@ class BindingGenerator:
         # 10. Fallback for unknown but declared types (structs, etc.)
         if type_spelling:
             # Remove "struct" prefix if present
-            if type_spelling.startswith("struct "):
-                return type_spelling[7:]
-            return type_spelling
+            return type_spelling.removeprefix("struct ")
 
         return "any" # Last resort
 
@@ -241,14 +361,14 @@ class BindingGenerator:
         print(f"Parsing header: {header_path}")
         index = Index.create()
         # Use '-x', 'c-header' to force parsing as C
-        # Add -fparse-all-comments to ensure we get macro definitions
-        args = ['-x', 'c-header', '-fparse-all-comments', '-dD']  # -dD preserves macro definitions
+        args = ['-x', 'c-header', '-dD']  # -dD preserves macro definitions
         if c_args:
             args.extend(c_args)
-        print(f"DEBUG: Parsing with args: {args}")
-        tu = index.parse(header_path, args=args, 
-                        options=TranslationUnit.PARSE_DETAILED_PROCESSING_RECORD | 
-                                TranslationUnit.PARSE_INCLUDE_BRIEF_COMMENTS_IN_CODE_COMPLETION)
+        log.debug("Parsing with args: %s", args)
+        # Macro cursors need the detailed record; nothing reads comments or function bodies
+        tu = index.parse(header_path, args=args,
+                        options=TranslationUnit.PARSE_DETAILED_PROCESSING_RECORD |
+                                TranslationUnit.PARSE_SKIP_FUNCTION_BODIES)
 
         if not tu:
             raise RuntimeError("Failed to parse the translation unit.")
@@ -257,123 +377,95 @@ class BindingGenerator:
         if has_errors:
             print("Clang errors encountered during parsing. Bindings may be incomplete.", file=sys.stderr)
 
-        self._visit_cursor(tu.cursor, header_path, c_args or [], is_root=True)
+        self._clang_args = c_args or []
+        self._main_header = tu.spelling
+        self._visit_cursor(tu.cursor, header_path, self._clang_args)
 
         # Post-process: fix field types using our contextual mappings
         self._fix_field_types()
 
-        # Fix field types by mapping anonymous/unnamed types
-        self._map_anonymous_field_types()
-
         # Final adjustments to constants (e.g., struct compound literals)
         self._postprocess_constants()
 
-    def _visit_cursor(self, cursor: Cursor, header_path: str = "", clang_args: Optional[List[str]] = None, is_root: bool = False):
-        """Recursively traverses the AST and dispatches to handlers."""
-        if not cursor or (cursor.location.file and "usr/include" in str(cursor.location.file)):
-            return
-        if cursor in self._processed_cursors:
+    def _visit_cursor(self, root: Cursor, header_path: str = "", clang_args: Optional[List[str]] = None):
+        """Traverses the AST in pre-order with an explicit stack and dispatches to handlers."""
+        if not root:
             return
-        self._processed_cursors.add(cursor)
-
-        kind = cursor.kind
-        print(f"DEBUG: Visiting cursor: {cursor.spelling} (kind: {kind})")
-
-        if kind == CursorKind.STRUCT_DECL:
-            self._handle_struct_or_union(cursor, is_union=False)
-        elif kind == CursorKind.UNION_DECL:
-            self._handle_struct_or_union(cursor, is_union=True)
-        elif kind == CursorKind.ENUM_DECL:
-            self._handle_enum(cursor)
-        elif kind == CursorKind.FUNCTION_DECL:
-            self._handle_function(cursor)
-        elif kind == CursorKind.TYPEDEF_DECL:
-            self._handle_typedef(cursor)
-        elif kind == CursorKind.MACRO_DEFINITION:
-            print(f"DEBUG: Found macro definition: {cursor.spelling}")
-            # Queue macros to process after types so struct info is available
-            is_first = True
-            for prev_cursor in cursor.translation_unit.cursor.get_children():
-                if prev_cursor.kind == CursorKind.MACRO_DEFINITION and prev_cursor != cursor:
-                    is_first = False
-                    break
-            self._queued_macros.append((cursor, str(cursor.location.file), clang_args or [], is_first))
-
-        for child in cursor.get_children():
-            self._visit_cursor(child, header_path, clang_args, is_root=False)
-
-        # Only flush once, after walking the TU root
-        if is_root and self._queued_macros:
-            print(f"DEBUG: Flushing {len(self._queued_macros)} queued macros after type collection")
+        clang_args = clang_args or []
+        processed = self._processed_cursors
+        handlers = self._kind_handlers
+        # The level cannot change mid-walk, so ask the logger once rather than per cursor
+        debug = log.isEnabledFor(logging.DEBUG)
+        # Everything under a top-level declaration lives in that declaration's file,
+        # so system headers only need to be filtered out once, at the root. The
+        # header being bound is always kept, even when installed under /usr/include
+        main_header = self._main_header
+        stack = []
+        for child in root.get_children():
+            loc_file = child.location.file
+            if not (loc_file and is_system_header(loc_file.name, main_header=main_header)):
+                stack.append(child)
+        stack.reverse()
+        while stack:
+            cursor = stack.pop()
+            cursor_hash = cursor.hash
+            if cursor_hash in processed:
+                continue
+            processed.add(cursor_hash)
+
+            kind = cursor.kind
+            if debug:
+                log.debug("Visiting cursor: %s (kind: %s)", cursor.spelling, kind)
+
+            handler = handlers.get(kind)
+            if handler:
+                handler(cursor)
+
+            # Reversed so children pop in source order, matching a recursive walk
+            stack.extend(reversed(list(cursor.get_children())))
+
+        # Flush once, after the whole tree has been walked
+        if self._queued_macros:
+            log.debug("Flushing %s queued macros after type collection", len(self._queued_macros))
             for mc, hp, ca, is_first in self._queued_macros:
                 self._handle_macro(mc, hp, ca, is_first_macro=is_first)
             self._queued_macros.clear()
+            self._flush_deferred_macros(clang_args)
+
+    def _queue_macro(self, cursor: Cursor):
+        """Queues a macro to process after types so struct info is available."""
+        log.debug("Found macro definition: %s", cursor.spelling)
+        is_first = not self._seen_macro
+        self._seen_macro = True
+        self._queued_macros.append((cursor, str(cursor.location.file), self._clang_args, is_first))
 
     def _fix_field_types(self):
         """Post-process field types to use contextual names instead of raw clang spelling."""
-        print("DEBUG: Post-processing field types...")
-        print(f"DEBUG: Available clang_to_contextual mappings: {list(self.clang_to_contextual.keys())}")
-
-        # Fix struct field types
-        for struct_name, struct in self.structs.items():
-            for field in struct.fields:
-                original_type = field.ntype
-                # Try to get mapped type
-                mapped_type = self._get_unnamed_object_mapping(original_type)
-                if mapped_type:
-                    field.ntype = mapped_type
-                    print(f"DEBUG: Fixed struct field '{field.name}' in '{struct_name}': '{original_type}' -> '{field.ntype}'")
+        log.debug("Post-processing field types...")
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug("Available clang_to_contextual mappings: %s", list(self.clang_to_contextual.keys()))
 
-        # Fix union field types
-        for union_name, union in self.unions.items():
-            for field in union.fields:
+        # Plain spellings fall straight through _get_unnamed_object_mapping, so one pass covers both
+        for record in chain(self.structs.values(), self.unions.values()):
+            for field in record.fields:
                 original_type = field.ntype
-                # Try to get mapped type
                 mapped_type = self._get_unnamed_object_mapping(original_type)
                 if mapped_type:
                     field.ntype = mapped_type
-                    print(f"DEBUG: Fixed union field '{field.name}' in '{union_name}': '{original_type}' -> '{field.ntype}'")
-
-    def _map_anonymous_field_types(self):
-        """
-        Post-processes field types to map anonymous and unnamed types
-        to their contextual names if they were previously mapped.
-        """
-        print("DEBUG: Post-processing anonymous field types...")
-        print(f"DEBUG: Available clang_to_contextual mappings: {list(self.clang_to_contextual.keys()) if self.clang_to_contextual else 'none'}")
-
-        # Iterate through all structs and unions to find anonymous/unnamed types
-        for struct_name, struct in self.structs.items():
-            for field in struct.fields:
-                if "anonymous" in field.ntype or "unnamed" in field.ntype:
-                    print(f"DEBUG: Found anonymous/unnamed struct field '{field.name}' in '{struct_name}': '{field.ntype}'")
-                    mapped_type = self._get_unnamed_object_mapping(field.ntype)
-                    if mapped_type:
-                        field.ntype = mapped_type
-                        print(f"DEBUG: Mapped struct field '{field.name}' from '{field.ntype}' to '{mapped_type}'")
-
-        for union_name, union in self.unions.items():
-            for field in union.fields:
-                if "anonymous" in field.ntype or "unnamed" in field.ntype:
-                    print(f"DEBUG: Found anonymous/unnamed union field '{field.name}' in '{union_name}': '{field.ntype}'")
-                    mapped_type = self._get_unnamed_object_mapping(field.ntype)
-                    if mapped_type:
-                        field.ntype = mapped_type
-                        print(f"DEBUG: Mapped union field '{field.name}' from '{field.ntype}' to '{mapped_type}'")
+                    log.debug("Fixed field '%s' in '%s': '%s' -> '%s'", field.name, record.name, original_type, mapped_type)
 
     def _postprocess_constants(self):
         """Fix up constant values and types after full AST traversal."""
-        import re as _re
         to_update: Dict[str, Constant] = {}
         for name, const in list(self.constants.items()):
             value = const.value or ""
             # Drop empty values (e.g., header guards)
             if value == "":
-                print(f"DEBUG: Dropping empty constant '{name}'")
+                log.debug("Dropping empty constant '%s'", name)
                 self.constants.pop(name, None)
                 continue
             # Normalize struct initializers to named-field form using recursive formatter
-            m_named = _re.match(r"^(?:struct\s+)?(\w+)\s*\{([\s\S]*)\}$", value)
+            m_named = _STRUCT_INIT_RE.match(value)
             if m_named:
                 struct_name = m_named.group(1)
                 init_body = m_named.group(2)
@@ -381,11 +473,11 @@ class BindingGenerator:
                     new_value = self._format_struct_initializer(struct_name, init_body) or f"{struct_name}{{{init_body}}}"
                     new_ctype = struct_name
                     if const.ctype != new_ctype or value != new_value:
-                        print(f"DEBUG: Post-processed constant '{name}': '{const.ctype} {value}' -> '{new_ctype} {new_value}'")
+                        log.debug("Post-processed constant '%s': '%s %s' -> '%s %s'", name, const.ctype, value, new_ctype, new_value)
                     to_update[name] = Constant(name=name, value=new_value, ctype=new_ctype)
                     continue
             # Convert unknown typeof(T) to T when possible
-            m_typeof = _re.match(r"^typeof\((\w+)\)$", const.ctype or "")
+            m_typeof = _TYPEOF_RE.match(const.ctype or "")
             if m_typeof and m_typeof.group(1) in self.structs:
                 real = m_typeof.group(1)
                 if value == "<unknown>":
@@ -400,91 +492,101 @@ class BindingGenerator:
 
     def _get_contextual_name(self, cursor: Cursor, prefix: str) -> str:
         """Creates a stable name for anonymous records based on context."""
-        if cursor.spelling and not "anonymous" in cursor.spelling and not "unnamed" in cursor.spelling:
-            return cursor.spelling
+        key = (cursor.hash, prefix)
+        name = self._contextual_name_cache.get(key)
+        if name is None:
+            name = self._contextual_name_cache[key] = self._build_contextual_name(cursor, prefix)
+        return name
+
+    def _build_contextual_name(self, cursor: Cursor, prefix: str) -> str:
+        """Uncached naming behind _get_contextual_name."""
+        spelling = cursor.spelling
+        if spelling and not "anonymous" in spelling and not "unnamed" in spelling:
+            return spelling
 
         # Create a name based on the parent's name and the field name
+        cursor_hash = cursor.hash
         parent = cursor.semantic_parent
         if parent:
+            parent_name = parent.spelling or "Anonymous"
             # Find the field that this anonymous record is the type of
             for child in parent.get_children():
-                if child.kind == CursorKind.FIELD_DECL and child.type.get_declaration() == cursor:
-                    field_name = child.spelling
-                    parent_name = parent.spelling or "Anonymous"
-                    return f"{parent_name}_{field_name}_{prefix}"
+                if child.kind == CursorKind.FIELD_DECL and child.type.get_declaration().hash == cursor_hash:
+                    return f"{parent_name}_{child.spelling}_{prefix}"
 
             # If this is a nested anonymous struct/union
             if parent.kind == CursorKind.STRUCT_DECL:
-                parent_name = parent.spelling or "Anonymous"
                 return f"{parent_name}_nested_{prefix}"
 
-        return f"Anonymous_{prefix}_{cursor.hash}" # Fallback
+        return f"Anonymous_{prefix}_{cursor_hash}" # Fallback
 
 
     def _split_top_level(self, text: str) -> List[str]:
-        """Split a comma-separated initializer at top level, ignoring nested braces/parens."""
+        """Split a comma-separated initializer at top level, ignoring nested braces/parens and string literals."""
         parts: List[str] = []
-        buf: List[str] = []
         depth_brace = 0
         depth_paren = 0
-        i = 0
-        while i < len(text):
-            ch = text[i]
-            if ch == '{':
+        quote = None  # Quote character of the literal being skipped, if any
+        start = 0
+        for m in _SPLIT_RE.finditer(text):
+            ch = m.group()
+            if quote:
+                if ch == quote:
+                    quote = None
+            elif ch == '"' or ch == "'":
+                quote = ch
+            elif ch == '{':
                 depth_brace += 1
-                buf.append(ch)
             elif ch == '}':
                 depth_brace -= 1
-                buf.append(ch)
             elif ch == '(':
                 depth_paren += 1
-                buf.append(ch)
             elif ch == ')':
                 depth_paren -= 1
-                buf.append(ch)
             elif ch == ',' and depth_brace == 0 and depth_paren == 0:
-                part = ''.join(buf).strip()
+                part = text[start:m.start()].strip()
                 if part:
                     parts.append(part)
-                buf = []
-            else:
-                buf.append(ch)
-            i += 1
-        tail = ''.join(buf).strip()
+                start = m.end()
+        tail = text[start:].strip()
         if tail:
             parts.append(tail)
         return parts
 
+    def _find_union(self, name: str) -> Optional[Union]:
+        """Returns the first union whose generated name is `name`, if any."""
+        if self._union_by_name is None:
+            self._union_by_name = {}
+            for u in self.unions.values():
+                self._union_by_name.setdefault(u.name, u)
+        return self._union_by_name.get(name)
+
     def _format_struct_initializer(self, struct_name: str, inner_text: str) -> Optional[str]:
         """Return named-field initializer for struct_name using inner_text, recursively handling nested structs/unions."""
         if struct_name not in self.structs:
             return None
         field_values = self._split_top_level(inner_text)
-        print(f"DEBUG: _format_struct_initializer struct={struct_name} inner='{inner_text}' -> parts={field_values}")
+        log.debug("_format_struct_initializer struct=%s inner='%s' -> parts=%s", struct_name, inner_text, field_values)
         field_names = [f.name for f in self.structs[struct_name].fields]
         pairs: List[str] = []
         for i, fname in enumerate(field_names):
             if i >= len(field_values):
                 break
             raw_val = field_values[i]
-            print(f"DEBUG:   field {fname} type={self.structs[struct_name].fields[i].ntype} raw='{raw_val}'")
+            if log.isEnabledFor(logging.DEBUG):
+                log.debug("  field %s type=%s raw='%s'", fname, self.structs[struct_name].fields[i].ntype, raw_val)
             # Handle designated initializers: field=value
             if raw_val.strip().startswith(f"{fname}="):
                 rhs = raw_val.split('=', 1)[1].strip()
                 ftype = self.structs[struct_name].fields[i].ntype
                 nested_struct = ftype if ftype in self.structs else None
-                union_def = None
-                for u in self.unions.values():
-                    if getattr(u, 'name', None) == ftype:
-                        union_def = u
-                        break
+                union_def = self._find_union(ftype)
                 if nested_struct:
                     nested_inner = None
                     if rhs.startswith('{') and rhs.endswith('}'):
                         nested_inner = rhs[1:-1].strip()
                     elif rhs.startswith('(') and rhs.endswith('}'):
-                        import re as _re
-                        m = _re.match(r"^\(\s*(?:struct\s+)?(\w+)\s*\)\s*\{([\s\S]*)\}$", rhs)
+                        m = _DESIGNATED_CAST_RE.match(rhs)
                         if m and m.group(1) == nested_struct:
                             nested_inner = m.group(2)
                     nested_fmt = self._format_struct_initializer(nested_struct, nested_inner) if nested_inner is not None else None
@@ -512,19 +614,14 @@ class BindingGenerator:
             ftype = self.structs[struct_name].fields[i].ntype
             nested_struct = ftype if ftype in self.structs else None
             # unions are stored by contextual key; match by union value name
-            union_def = None
-            for u in self.unions.values():
-                if getattr(u, 'name', None) == ftype:
-                    union_def = u
-                    break
+            union_def = self._find_union(ftype)
             if nested_struct:
                 # Accept '{...}' or '(Type){...}' forms
                 nested_inner = None
                 if raw_val.startswith('{') and raw_val.endswith('}'):
                     nested_inner = raw_val[1:-1].strip()
                 elif raw_val.startswith('(') and raw_val.endswith('}'):
-                    import re as _re
-                    m = _re.match(r"^\(\s*(?:struct\s+)?(\w+)\s*\)\s*\{([\s\S]*)\}$", raw_val)
+                    m = _DESIGNATED_CAST_RE.match(raw_val)
                     if m:
                         cand_type, inner = m.group(1), m.group(2)
                         if cand_type == nested_struct:
@@ -556,19 +653,22 @@ class BindingGenerator:
                 else:
                     pairs.append(f"{fname}={raw_val}")
         formatted = f"{struct_name}{{{','.join(pairs)}}}"
-        print(f"DEBUG: _format_struct_initializer result: {formatted}")
+        log.debug("_format_struct_initializer result: %s", formatted)
         return formatted
 
 
     def _handle_struct_or_union(self, cursor: Cursor, is_union: bool):
         if not cursor.is_definition(): return
+        spelling = cursor.spelling
 
         prefix = "Union" if is_union else "Struct"
         decl_name = self._get_contextual_name(cursor, prefix)
 
         # For anonymous structs/unions, create a better contextual name
-        if not cursor.spelling or "anonymous" in cursor.spelling or "unnamed" in cursor.spelling:
-            print(f"DEBUG: Processing anonymous type with spelling: '{cursor.spelling}'")
+        is_anonymous = not spelling or "anonymous" in spelling or "unnamed" in spelling
+        unnamed_obj = self._parse_unnamed_object(spelling) if is_anonymous and spelling else None
+        if is_anonymous:
+            log.debug("Processing anonymous type with spelling: '%s'", spelling)
             parent = cursor.semantic_parent
             if parent and parent.kind == CursorKind.FIELD_DECL:
                 # This is a field of a struct/union, use parent context
@@ -577,34 +677,28 @@ class BindingGenerator:
                     field_name = parent.spelling
                     struct_name = parent_struct.spelling or "Anonymous"
                     decl_name = f"{struct_name}_{field_name}_{prefix}"
-                    print(f"DEBUG: Created contextual name: '{decl_name}' for field '{field_name}' in '{struct_name}'")
-                                    # Store mapping immediately
-                if cursor.spelling:
-                    unnamed_obj = self._parse_unnamed_object(cursor.spelling)
-                    if unnamed_obj:
-                        self.clang_to_contextual[unnamed_obj] = decl_name
-                        print(f"DEBUG: Stored mapping '{cursor.spelling}' -> '{decl_name}'")
+                    log.debug("Created contextual name: '%s' for field '%s' in '%s'", decl_name, field_name, struct_name)
+                # Store mapping immediately
+                if unnamed_obj:
+                    self._store_unnamed_mapping(unnamed_obj, decl_name)
+                    log.debug("Stored mapping '%s' -> '%s'", spelling, decl_name)
             elif parent and parent.kind == CursorKind.STRUCT_DECL:
                 # Nested anonymous struct
                 parent_name = parent.spelling or "Anonymous"
                 decl_name = f"{parent_name}_nested_{prefix}"
-                print(f"DEBUG: Created contextual name: '{decl_name}' for nested struct in '{parent_name}'")
+                log.debug("Created contextual name: '%s' for nested struct in '%s'", decl_name, parent_name)
                 # Store mapping immediately
-                if cursor.spelling:
-                    unnamed_obj = self._parse_unnamed_object(cursor.spelling)
-                    if unnamed_obj:
-                        self.clang_to_contextual[unnamed_obj] = decl_name
-                        print(f"DEBUG: Stored mapping '{cursor.spelling}' -> '{decl_name}'")
+                if unnamed_obj:
+                    self._store_unnamed_mapping(unnamed_obj, decl_name)
+                    log.debug("Stored mapping '%s' -> '%s'", spelling, decl_name)
             else:
                 # Fallback for truly anonymous types
                 decl_name = f"Anonymous_{prefix}_{cursor.hash}"
-                print(f"DEBUG: Created fallback name: '{decl_name}'")
+                log.debug("Created fallback name: '%s'", decl_name)
                 # Store mapping immediately
-                if cursor.spelling:
-                    unnamed_obj = self._parse_unnamed_object(cursor.spelling)
-                    if unnamed_obj:
-                        self.clang_to_contextual[unnamed_obj] = decl_name
-                        print(f"DEBUG: Stored mapping '{unnamed_obj}' -> '{decl_name}'")
+                if unnamed_obj:
+                    self._store_unnamed_mapping(unnamed_obj, decl_name)
+                    log.debug("Stored mapping '%s' -> '%s'", unnamed_obj, decl_name)
 
         target_dict = self.unions if is_union else self.structs
         if decl_name in target_dict: return
@@ -619,63 +713,69 @@ class BindingGenerator:
 
                 # Check if this type contains anonymous or unnamed and try to map it
                 if "anonymous" in nature_type or "unnamed" in nature_type:
-                    if nature_type in self.clang_to_contextual:
-                        nature_type = self.clang_to_contextual[self._parse_unnamed_object(nature_type) or UnnamedObject(is_union=False, file="", location="")]
-                        print(f"DEBUG: Mapped field type '{field_name}' from '{nature_type}' to '{self.clang_to_contextual[self._parse_unnamed_object(nature_type) or UnnamedObject(is_union=False, file="", location="")]}'")
+                    mapped_type = self._get_unnamed_object_mapping(nature_type)
+                    if mapped_type:
+                        if log.isEnabledFor(logging.DEBUG):
+                            log.debug("Mapped field type '%s' from '%s' to '%s'", field_name, nature_type, mapped_type)
+                        nature_type = mapped_type
 
                 fields.append(StructField(name=field_name, ntype=nature_type))
 
         if is_union:
             size = cursor.type.get_size()
             if size <= 0: return # Don't process incomplete unions
-            union_name_by_size = f"Union_{num2words(size)}_bytes"
+            union_name_by_size = _union_type_name(size)
             self.unions[decl_name] = Union(name=union_name_by_size, size=size, fields=fields, cursor=cursor)
+            self._union_by_name = None
             # Store the original name and size mapping
             self.union_sizes[decl_name] = size
             # Map the original name to the sized name for type mapping
             self.typedefs[decl_name] = union_name_by_size
             # For unions, update the mapping to use the size-based name
-            if cursor.spelling and ("anonymous" in cursor.spelling or "unnamed" in cursor.spelling):
-                unnamed_obj = self._parse_unnamed_object(cursor.spelling)
-                if unnamed_obj:
-                    self.clang_to_contextual[unnamed_obj] = union_name_by_size
-                    print(f"DEBUG: Updated union mapping '{cursor.spelling}' -> '{union_name_by_size}'")
+            if unnamed_obj:
+                self._store_unnamed_mapping(unnamed_obj, union_name_by_size)
+                log.debug("Updated union mapping '%s' -> '%s'", spelling, union_name_by_size)
         else:
             self.structs[decl_name] = Struct(name=decl_name, fields=fields, cursor=cursor)
             # Store mapping from raw clang spelling to contextual name
-            if cursor.spelling and ("anonymous" in cursor.spelling or "unnamed" in cursor.spelling):
-                unnamed_obj = self._parse_unnamed_object(cursor.spelling)
-                if unnamed_obj:
-                    self.clang_to_contextual[unnamed_obj] = decl_name
-                    print(f"DEBUG: Stored struct mapping '{cursor.spelling}' -> '{decl_name}'")
+            if unnamed_obj:
+                self._store_unnamed_mapping(unnamed_obj, decl_name)
+                log.debug("Stored struct mapping '%s' -> '%s'", spelling, decl_name)
+        self._dependent_type_cache.clear()
+        self._macro_processor.clear_type_cache()
 
 
     def _handle_enum(self, cursor: Cursor):
         enum_name = cursor.spelling
-        if not enum_name or enum_name in self.enums: return
+        enums = self.enums
+        if not enum_name or enum_name in enums: return
 
         print(f"Found Enum: {enum_name}")
+        constant_kind = CursorKind.ENUM_CONSTANT_DECL
         members = [
             EnumMember(name=c.spelling, value=c.enum_value)
-            for c in cursor.get_children() if c.kind == CursorKind.ENUM_CONSTANT_DECL
+            for c in cursor.get_children() if c.kind == constant_kind
         ]
-        self.enums[enum_name] = Enum(name=enum_name, members=members)
+        enums[enum_name] = Enum(name=enum_name, members=members)
 
     def _handle_function(self, cursor: Cursor):
         func_name = cursor.spelling
-        if not func_name or func_name in self.functions: return
+        functions = self.functions
+        if not func_name or func_name in functions: return
 
         print(f"Found Function: {func_name}")
-        return_type = self._map_c_type_to_nature(cursor.result_type)
+        map_type = self._map_c_type_to_nature
+        sanitize = self._sanitize_name
+        return_type = map_type(cursor.result_type)
         params = [
             Parameter(
-                name=self._sanitize_name(p.spelling or f"arg{i}"),
-                ntype=self._map_c_type_to_nature(p.type)
+                name=sanitize(p.spelling or f"arg{i}"),
+                ntype=map_type(p.type)
             )
             for i, p in enumerate(cursor.get_arguments())
         ]
 
-        self.functions[func_name] = Function(
+        functions[func_name] = Function(
             name=func_name, c_name=cursor.mangled_name,
             return_type=return_type, parameters=params,
             is_variadic=cursor.type.is_function_variadic()
@@ -688,8 +788,9 @@ class BindingGenerator:
         # Handle typedefs for anonymous records, e.g., typedef struct { ... } MyStruct;
         # In this case, we name the record `MyStruct`.
         underlying_decl = underlying_type.get_declaration()
-        if underlying_decl.kind in (CursorKind.STRUCT_DECL, CursorKind.UNION_DECL) and not underlying_decl.spelling:
-            is_union = underlying_decl.kind == CursorKind.UNION_DECL
+        decl_kind = underlying_decl.kind
+        if decl_kind in (CursorKind.STRUCT_DECL, CursorKind.UNION_DECL) and not underlying_decl.spelling:
+            is_union = decl_kind == CursorKind.UNION_DECL
             self._handle_struct_or_union(underlying_decl, is_union)
             # Find the anonymous record we just created and rename it
             anon_name = self._get_contextual_name(underlying_decl, "Union" if is_union else "Struct")
@@ -700,177 +801,141 @@ class BindingGenerator:
                 # Type assertion to handle the union type
                 if is_union:
                     self.unions[name] = record  # type: ignore
+                    self._union_by_name = None
                 else:
                     self.structs[name] = record  # type: ignore
             self.typedefs[name] = name # Map the typedef name to the new record name
+            self._dependent_type_cache.clear()
+            self._macro_processor.clear_type_cache()
             return
 
         mapped_type = self._map_c_type_to_nature(underlying_type)
         self.typedefs[name] = mapped_type
+        self._dependent_type_cache.clear()
         print(f"Found Typedef: {name} -> {mapped_type}")
 
     def _handle_macro(self, cursor: Cursor, header_path: str, clang_args: List[str], is_first_macro: bool = False):
         macro_name = cursor.spelling
-        print(f"DEBUG: Handling macro: {macro_name}")
-        if macro_name in self.constants:
-            print(f"DEBUG: Macro {macro_name} already processed, skipping")
+        log.debug("Handling macro: %s", macro_name)
+        constants = self.constants
+        if macro_name in constants:
+            log.debug("Macro %s already processed, skipping", macro_name)
             return
 
         # Skip internal/compiler macros
         if macro_name.startswith('__'):
-            print(f"DEBUG: Skipping internal macro: {macro_name}")
+            log.debug("Skipping internal macro: %s", macro_name)
             return
 
         # Skip internal macros
-        if not cursor.location.file:
-            print(f"DEBUG: Skipping macro with no location: {macro_name}")
+        loc_file = cursor.location.file
+        if not loc_file:
+            log.debug("Skipping macro with no location: %s", macro_name)
             return
 
-        # Skip macros from system headers (included with <>)
-        file_path = str(cursor.location.file)
-        
-        # Get tokens safely
-        tokens = []
-        if cursor.extent and cursor.translation_unit:
+        # Skip macros from system headers, before paying for tokenization
+        file_path = str(loc_file)
+        if is_system_header(file_path, main_header=self._main_header):
+            log.debug("Skipping macro from system header: %s", macro_name)
+            return
+
+        # An extent spanning only the name means an empty replacement (header guards and
+        # flag macros); these never yield a constant, so skip them before tokenizing
+        extent = cursor.extent
+        if extent and extent.end.offset - extent.start.offset == len(macro_name):
+            log.debug("Skipping macro with empty replacement: %s", macro_name)
+            return
+
+        # Read the definition's tokens once; every check below works on their spellings
+        spellings: List[str] = []
+        if extent:
             try:
-                tokens = list(cursor.translation_unit.get_tokens(extent=cursor.extent))
+                spellings = [t.spelling for t in cursor.get_tokens()]
             except Exception as e:
-                print(f"DEBUG: Error getting tokens: {e}")
-                tokens = []
-
-        # Check for system header includes
-        for i, token in enumerate(tokens[:-2]):  # Need at least 3 tokens for include
-            if token.spelling == '#' and tokens[i + 1].spelling == 'include':
-                include_path = tokens[i + 2].spelling
-                if include_path.startswith('<') and include_path.endswith('>'):
-                    if include_path[1:-1] in file_path:
-                        print(f"DEBUG: Skipping macro from system header: {macro_name}")
-                        return
-                else:
-                    print(f"Header Path: {include_path}")
+                log.debug("Error getting tokens: %s", e)
+                spellings = []
 
         # Skip first macro if it's likely a header guard
         if is_first_macro:
             # Check if this file uses pragma once instead of header guards
-            has_pragma_once = False
-            if cursor.extent and cursor.translation_unit:
-                try:
-                    tokens = list(cursor.translation_unit.get_tokens(extent=cursor.extent))
-                    for i, token in enumerate(tokens[:-1]):  # Skip last token to avoid index error
-                        if token.spelling == 'pragma' and tokens[i + 1].spelling == 'once':
-                            has_pragma_once = True
-                            break
-                except Exception as e:
-                    print(f"DEBUG: Error getting tokens: {e}")
-                    has_pragma_once = False
-            
+            has_pragma_once = any(
+                spellings[i] == 'pragma' and spellings[i + 1] == 'once'
+                for i in range(len(spellings) - 1)
+            )
             if not has_pragma_once:
-                print(f"DEBUG: Skipping first macro (likely header guard): {macro_name}")
+                log.debug("Skipping first macro (likely header guard): %s", macro_name)
                 return
 
         # Try a fast path: parse the macro replacement directly from the macro definition tokens
-        fast_tokens = []
-        if cursor.extent:
-            try:
-                fast_tokens = list(cursor.get_tokens())
-            except Exception as e:
-                print(f"DEBUG: Could not read macro tokens for fast path: {e}")
-                fast_tokens = []
-
-        if fast_tokens:
+        if spellings:
             # Expect a pattern like: #, define, NAME, <replacement...>
             try:
-                name_index = next(i for i, t in enumerate(fast_tokens) if t.spelling == macro_name)
-            except StopIteration:
+                name_index = spellings.index(macro_name)
+            except ValueError:
                 name_index = -1
-            if name_index != -1 and name_index + 1 < len(fast_tokens):
+            if name_index != -1 and name_index + 1 < len(spellings):
                 # Skip function-like macro definitions (NAME(...))
-                if fast_tokens[name_index + 1].spelling == '(':
-                    print(f"DEBUG: Skipping function-like macro def: {macro_name}")
+                if spellings[name_index + 1] == '(':
+                    log.debug("Skipping function-like macro def: %s", macro_name)
                     return
-                replacement_tokens = fast_tokens[name_index + 1:]
-                replacement = ''.join(t.spelling for t in replacement_tokens).strip()
-                print(f"DEBUG: Macro replacement for {macro_name}: '{replacement}'")
+                replacement = ''.join(spellings[name_index + 1:]).strip()
+                log.debug("Macro replacement for %s: '%s'", macro_name, replacement)
                 if replacement:
                     # Detect struct compound literals: (Type){...} or Type{...}
-                    import re as _re
                     # Handle CLITERAL(Type){...} → Type{...}
-                    m_clit = _re.match(r"^CLITERAL\s*\(\s*(?:struct\s+)?(\w+)\s*\)\s*\{([\s\S]*)\}$", replacement)
+                    m_clit = _CLITERAL_RE.match(replacement)
                     if m_clit:
                         struct_name = m_clit.group(1)
                         if struct_name in self.structs:
                             raw_vals = m_clit.group(2)
                             value = self._format_struct_initializer(struct_name, raw_vals) or f"{struct_name}{{{raw_vals}}}"
                             ctype = struct_name
-                            self.constants[macro_name] = Constant(name=macro_name, value=value, ctype=ctype)
-                            print(f"DEBUG: [fast-CLITERAL] Added constant: {macro_name} = {value} ({ctype})")
+                            constants[macro_name] = Constant(name=macro_name, value=value, ctype=ctype)
+                            log.debug("[fast-CLITERAL] Added constant: %s = %s (%s)", macro_name, value, ctype)
                             return
                         # Fallthrough to processor if unknown struct
-                    m = _re.match(r"^\(\s*(?:struct\s+)?(\w+)\s*\)\s*\{([\s\S]*)\}$", replacement)
-                    if not m:
-                        m = _re.match(r"^(?:struct\s+)?(\w+)\s*\{([\s\S]*)\}$", replacement)
+                    m = _DESIGNATED_CAST_RE.match(replacement) or _STRUCT_INIT_RE.match(replacement)
                     if m:
                         struct_name = m.group(1)
                         if struct_name in self.structs:
                             raw_vals = m.group(2)
                             value = self._format_struct_initializer(struct_name, raw_vals) or f"{struct_name}{{{raw_vals}}}"
                             ctype = struct_name
-                            self.constants[macro_name] = Constant(name=macro_name, value=value, ctype=ctype)
-                            print(f"DEBUG: [fast-struct] Added constant: {macro_name} = {value} ({ctype})")
+                            constants[macro_name] = Constant(name=macro_name, value=value, ctype=ctype)
+                            log.debug("[fast-struct] Added constant: %s = %s (%s)", macro_name, value, ctype)
                             return
                         else:
                             # Unknown struct; fall back to processor
-                            from macro_processor import MacroProcessor
-                            processor = MacroProcessor(self.structs, self.unions)
-                            result = processor.process_macro(header_path=str(cursor.location.file), define_name=macro_name, clang_args=clang_args)
-                            if result:
-                                try:
-                                    first_space = result.find(' ')
-                                    eq_pos = result.find('=')
-                                    semi_pos = result.rfind(';')
-                                    ctype = result[:first_space].strip()
-                                    name = result[first_space:eq_pos].strip()
-                                    value = result[eq_pos+1: semi_pos if semi_pos != -1 else None].strip()
-                                    self.constants[name] = Constant(name=name, value=value, ctype=ctype)
-                                    print(f"DEBUG: [fast->proc] Added constant: {name} = {value} ({ctype})")
-                                    return
-                                except Exception:
-                                    pass
+                            result = self._macro_processor.process_macro(header_path=file_path, define_name=macro_name, clang_args=clang_args,
+                                                                        main_header=self._main_header)
+                            m_result = _MACRO_RESULT_RE.match(result) if result else None
+                            if m_result:
+                                ctype, name, value = m_result.groups()
+                                constants[name] = Constant(name=name, value=value, ctype=ctype)
+                                log.debug("[fast->proc] Added constant: %s = %s (%s)", name, value, ctype)
+                                return
                     # Determine a simple or alias type
                     # Skip pure identifier aliases (likely unresolved or function aliases)
-                    if _re.fullmatch(r"[A-Za-z_]\w*", replacement):
+                    if _IDENT_RE.fullmatch(replacement):
                         # If it aliases a known function, definitely skip
                         if replacement in self.functions:
-                            print(f"DEBUG: Skipping function alias macro: {macro_name} -> {replacement}")
+                            log.debug("Skipping function alias macro: %s -> %s", macro_name, replacement)
                             return
-                        print(f"DEBUG: Skipping identifier alias macro: {macro_name} -> {replacement}")
+                        log.debug("Skipping identifier alias macro: %s -> %s", macro_name, replacement)
                         return
                     # Skip function-like invocations e.g. (n,sz)calloc(n,sz) or free(ptr)
                     if '(' in replacement and ')' in replacement and not replacement.startswith('(') and '){' not in replacement:
-                        print(f"DEBUG: Skipping invocation-like macro: {macro_name} -> {replacement}")
+                        log.debug("Skipping invocation-like macro: %s -> %s", macro_name, replacement)
                         return
                     # Strings
                     if replacement.startswith('"') and replacement.endswith('"'):
                         ctype = 'anyptr'
                         value = f"{replacement}.ref()"
-                        self.constants[macro_name] = Constant(name=macro_name, value=value, ctype=ctype)
-                        print(f"DEBUG: [fast-str] Added constant: {macro_name} = {value} ({ctype})")
+                        constants[macro_name] = Constant(name=macro_name, value=value, ctype=ctype)
+                        log.debug("[fast-str] Added constant: %s = %s (%s)", macro_name, value, ctype)
                         return
                     # Numeric or arithmetic expressions
                     # Normalize float suffix 'f' and drop redundant outer parens
-                    def _strip_outer_parens(s: str) -> str:
-                        if s.startswith('(') and s.endswith(')'):
-                            # simple balance check
-                            depth=0
-                            for i,ch in enumerate(s):
-                                if ch=='(':
-                                    depth+=1
-                                elif ch==')':
-                                    depth-=1
-                                    if depth==0 and i!=len(s)-1:
-                                        return s
-                            return s[1:-1]
-                        return s
                     norm = replacement
                     norm = norm.replace('f)', ')')
                     norm = norm.replace('f*', '*')
@@ -878,54 +943,46 @@ class BindingGenerator:
                     norm = norm.replace('f+', '+')
                     norm = norm.replace('f-', '-')
                     # strip trailing f on lone numbers
-                    norm = _re.sub(r"(?<=\d)f\b", "", norm)
+                    norm = _FLOAT_SUFFIX_RE.sub("", norm)
                     norm = _strip_outer_parens(norm)
                     ctype = 'f32' if any(c in norm for c in ['.', 'e', 'E']) else 'i32'
-                    self.constants[macro_name] = Constant(name=macro_name, value=norm, ctype=ctype)
-                    print(f"DEBUG: [fast-num] Added constant: {macro_name} = {norm} ({ctype})")
+                    constants[macro_name] = Constant(name=macro_name, value=norm, ctype=ctype)
+                    log.debug("[fast-num] Added constant: %s = %s (%s)", macro_name, norm, ctype)
                     return
 
-        # Get the actual header file path
-        actual_header = str(cursor.location.file)
-        print(f"DEBUG: Using header path: {actual_header}")
-
-        from macro_processor import MacroProcessor
-        processor = MacroProcessor(self.structs, self.unions)
-        result = processor.process_macro(
-            header_path=actual_header,
-            define_name=macro_name,
-            clang_args=clang_args
-        )
-        print(f"DEBUG: Macro result: {result}")
-        
-        if result:
-            # Parse the result which should be in format "<type> <name> = <value>;"
-            try:
-                # Find first space (end of type) and ' = ' separator
-                first_space = result.find(' ')
-                eq_pos = result.find('=')
-                semi_pos = result.rfind(';')
-                if first_space == -1 or eq_pos == -1:
-                    raise ValueError("missing separators")
-                ctype = result[:first_space].strip()
-                name = result[first_space:eq_pos].strip()
-                # Remove any '=' from value start and trailing ';'
-                value = result[eq_pos+1: semi_pos if semi_pos != -1 else None].strip()
+        log.debug("Deferring macro %s for batched evaluation from: %s", macro_name, file_path)
+        self._deferred_macros.setdefault(file_path, []).append(macro_name)
+
+    def _flush_deferred_macros(self, clang_args: List[str]):
+        """Evaluates deferred macros with a single MacroProcessor parse per header."""
+        for header_path, macro_names in self._deferred_macros.items():
+            results = self._macro_processor.process_macros(
+                header_path=header_path,
+                define_names=macro_names,
+                clang_args=clang_args,
+                main_header=self._main_header
+            )
+            for result in results.values():
+                log.debug("Macro result: %s", result)
+                # Parse the result which should be in format "<type> <name> = <value>;"
+                m_result = _MACRO_RESULT_RE.match(result)
+                if not m_result:
+                    log.debug("Unexpected macro result format: %s", result)
+                    continue
+                ctype, name, value = m_result.groups()
                 self.constants[name] = Constant(name=name, value=value, ctype=ctype)
-                print(f"DEBUG: Added constant: {name} = {value} ({ctype})")
-            except Exception as e:
-                print(f"DEBUG: Unexpected macro result format: {result} ({e})")
+                log.debug("Added constant: %s = %s (%s)", name, value, ctype)
+        self._deferred_macros.clear()
 
 
     def generate_bindings(self) -> str:
         """Generates the full Nature language binding code as a string."""
 
-        def generate_constants_and_enums():
-            lines = []
+        def generate_constants_and_enums(lines: List[str]):
             if self.constants:
                 lines.append("// Constants from Macros")
                 # Simple alphabetical sort is sufficient for most cases
-                for const in sorted(self.constants.values(), key=lambda c: c.name):
+                for const in sorted(self.constants.values(), key=attrgetter("name")):
                     lines.append(f"{const.ctype} {const.name} = {const.value}")
 
             if self.enums:
@@ -933,10 +990,8 @@ class BindingGenerator:
                 for enum in self.enums.values():
                     for member in enum.members:
                         lines.append(f"int {enum.name}_{member.name} = {member.value}")
-            return "\n".join(lines)
 
-        def generate_records():
-            lines = []
+        def generate_records(lines: List[str]):
             # Generate unions first, as they are simple type aliases
             if self.unions:
                 lines.append("\n// Union Definitions (as byte arrays)\n")
@@ -946,16 +1001,9 @@ class BindingGenerator:
                     if union.name not in defined_unions:
                         lines.append(union.to_nature())
                         # Add helper constructor for writing typed value into byte array
-                        if union.size in (4, 8):
-                            elem_count = union.size
-                            zeros = ",".join(["zero"] * elem_count)
-                            lines.append("")
-                            lines.append(f"fn new{union.name}<T>(T value):{union.name} {{")
-                            lines.append("    u8 zero = 0 as u8")
-                            lines.append(f"    {union.name} result = [{zeros}]")
-                            lines.append(f"    result as anyptr as rawptr<T> as T = value")
-                            lines.append("    return result")
-                            lines.append("}")
+                        zeros = _UNION_CTOR_ZEROS.get(union.size)
+                        if zeros:
+                            lines.append(_UNION_CTOR_TMPL.format(name=union.name, zeros=zeros))
                         defined_unions.add(union.name)
 
             if self.structs:
@@ -966,15 +1014,14 @@ class BindingGenerator:
                         lines.append(f"    {f.ntype} {f.name}")
                     lines.append("}")
                     lines.append("")
-            return "\n".join(lines)
 
-        def generate_functions():
-            lines = ["\n// Function Bindings"]
+        def generate_functions(lines: List[str]):
+            lines.append("\n// Function Bindings")
             for func in self.functions.values():
                 # Add linkid tag for C interop
                 lines.append(f'#linkid {func.c_name}')
 
-                param_list = ", ".join(f"{p.ntype} {p.name}" for p in func.parameters)
+                param_list = func.param_str
 
                 # Handle variadic functions according to Nature syntax
                 if func.is_variadic:
@@ -984,17 +1031,14 @@ class BindingGenerator:
 
                 return_type = f":{func.return_type}" if func.return_type != "void" else ""
                 lines.append(f"fn {func.name}({param_list}){return_type}\n")
-            return "\n".join(lines)
 
-        # Assemble the final code
+        # Assemble the final code; sections append to one list so it is joined once
         header = "// Generated Nature bindings\n// This file was automatically generated naturebindgen.\n"
-        code_parts = [
-            header,
-            generate_constants_and_enums(),
-            generate_records(),
-            generate_functions(),
-        ]
-        return "\n".join(filter(None, code_parts))
+        out = [header]
+        generate_constants_and_enums(out)
+        generate_records(out)
+        generate_functions(out)
+        return "\n".join(out)
 
 
 # --- Main Execution ---
@@ -1012,9 +1056,17 @@ def main():
         "-I", dest="include_dirs", action="append", default=[],
         help="Add a directory to the Clang include path (e.g., -I/usr/include)."
     )
+    parser.add_argument(
+        "-v", "--verbose", action="store_true",
+        help="Print debug tracing."
+    )
 
     args = parser.parse_args()
 
+    logging.basicConfig(
+        level=logging.DEBUG if args.verbose else logging.INFO,
+        format="%(levelname)s: %(message)s",
+    )
 
     clang_args = [f"-I{d}" for d in args.include_dirs]
 
@@ -1029,8 +1081,10 @@ def main():
 
         output_code = generator.generate_bindings()
 
-        with open(args.output, "w") as f:
-            f.write(output_code)
+        # Encode once and hand the whole buffer to a single write
+        data = output_code.encode("utf-8")
+        with open(args.output, "wb", buffering=1 << 20) as f:
+            f.write(data)
 
         print(f"\nSuccessfully generated Nature bindings at: {args.output}")
 
@@ -10,7 +10,7 @@ class BindingGenerator:
     typedefs: dict[str, str]
     union_sizes: dict[str, int]
     clang_to_contextual: dict[UnnamedObject, str]
-    reserved_keywords: set[str]
+    reserved_keywords: frozenset[str]
     def __init__(self) -> None: ...
     def parse_header(self, header_path: str, c_args: list[str] | None = None): ...
     def generate_bindings(self) -> str: ...
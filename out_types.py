@@ -1,7 +1,7 @@
 from dataclasses import dataclass, field
 from typing import List, Optional
 
-@dataclass
+@dataclass(slots=True)
 class Constant:
     name: str
     ctype: str
@@ -10,12 +10,12 @@ class Constant:
     def __hash__(self):
         return hash(self.name)
 
-@dataclass
+@dataclass(slots=True)
 class Parameter:
     name: str
     ntype: str  # Nature type
 
-@dataclass
+@dataclass(slots=True)
 class Function:
     name: str
     c_name: str
@@ -23,18 +23,23 @@ class Function:
     parameters: List[Parameter]
     is_variadic: bool = False
 
-@dataclass
+    @property
+    def param_str(self) -> str:
+        """The "<ntype> <name>, ..." parameter list, always in step with parameters."""
+        return ", ".join(f"{p.ntype} {p.name}" for p in self.parameters)
+
+@dataclass(slots=True)
 class StructField:
     name: str
     ntype: str
 
-@dataclass
+@dataclass(slots=True)
 class Struct:
     name: str
     fields: List[StructField] = field(default_factory=list)
     cursor: Optional['Cursor'] = None
 
-@dataclass
+@dataclass(slots=True)
 class Union:
     name: str
     size: int
@@ -43,51 +48,53 @@ class Union:
 
     def to_nature(self) -> str:
         """Generates Nature code for the union as a type alias to [u8;N]."""
-        from num2words import num2words
-        size_in_words = num2words(self.size)
-        union_type_name = f"Union_{size_in_words}_bytes"
         return f"type {self.name} = [u8;{self.size}]\n"
 
-@dataclass
+@dataclass(slots=True)
 class EnumMember:
     name: str
     value: int
 
-@dataclass
+@dataclass(slots=True)
 class Enum:
     name: str
     members: List[EnumMember] = field(default_factory=list)
 
-@dataclass
-class UnnamedObject:
+class _UnnamedObjectSlots:
+    """Slots for UnnamedObject's derived values, kept out of its dataclass fields."""
+    __slots__ = ("_hash", "_str_at_start", "_str_at_end")
+
+@dataclass(frozen=True, slots=True)
+class UnnamedObject(_UnnamedObjectSlots):
+    """Identity of an unnamed record; frozen so it can key clang_to_contextual."""
     is_union: bool
     file: str
     location: str
 
-    def __hash__(self):
-        """Make UnnamedObject hashable for use as dictionary key."""
-        return hash((self.is_union, self.file, self.location))
+    def __post_init__(self):
+        # Instances are shared through the parse cache and probed constantly, so hash once
+        object.__setattr__(self, "_hash", hash((self.is_union, self.file, self.location)))
+        object.__setattr__(self, "_str_at_start", None)
+        object.__setattr__(self, "_str_at_end", None)
 
-    def __eq__(self, other):
-        """Required for hash-based containers like dict and set."""
-        if not isinstance(other, UnnamedObject):
-            return False
-        return (self.is_union == other.is_union and
-                self.file == other.file and
-                self.location == other.location)
+    def __hash__(self):
+        return self._hash
 
     def to_str(self, put_at_start: bool) -> str:
-        struct_or_union: str
+        cached = self._str_at_start if put_at_start else self._str_at_end
+        if cached is not None:
+            return cached
 
-        if self.is_union:
-            struct_or_union = "union"
-        else:
-            struct_or_union = "struct"
+        struct_or_union = "union" if self.is_union else "struct"
 
+        # Built on first use and kept, since the fields never change
         if put_at_start:
-            return f"{struct_or_union} (unnamed at {self.file}:{self.location})"
+            text = f"{struct_or_union} (unnamed at {self.file}:{self.location})"
+            object.__setattr__(self, "_str_at_start", text)
         else:
-            return f"(unnamed {struct_or_union} at {self.file}:{self.location})"
+            text = f"(unnamed {struct_or_union} at {self.file}:{self.location})"
+            object.__setattr__(self, "_str_at_end", text)
+        return text
 
 # Forward reference for type hints
 from clang.cindex import Cursor
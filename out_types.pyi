@@ -1,38 +1,40 @@
 from clang.cindex import Cursor
 from dataclasses import dataclass, field
 
-@dataclass
+@dataclass(slots=True)
 class Constant:
     name: str
     ctype: str
     value: str
     def __hash__(self): ...
 
-@dataclass
+@dataclass(slots=True)
 class Parameter:
     name: str
     ntype: str
 
-@dataclass
+@dataclass(slots=True)
 class Function:
     name: str
     c_name: str
     return_type: str
     parameters: list[Parameter]
     is_variadic: bool = ...
+    @property
+    def param_str(self) -> str: ...
 
-@dataclass
+@dataclass(slots=True)
 class StructField:
     name: str
     ntype: str
 
-@dataclass
+@dataclass(slots=True)
 class Struct:
     name: str
     fields: list[StructField] = field(default_factory=list)
     cursor: Cursor | None = ...
 
-@dataclass
+@dataclass(slots=True)
 class Union:
     name: str
     size: int
@@ -40,21 +42,23 @@ class Union:
     cursor: Cursor | None = ...
     def to_nature(self) -> str: ...
 
-@dataclass
+@dataclass(slots=True)
 class EnumMember:
     name: str
     value: int
 
-@dataclass
+@dataclass(slots=True)
 class Enum:
     name: str
     members: list[EnumMember] = field(default_factory=list)
 
-@dataclass
-class UnnamedObject:
+class _UnnamedObjectSlots: ...
+
+@dataclass(frozen=True, slots=True)
+class UnnamedObject(_UnnamedObjectSlots):
     is_union: bool
     file: str
     location: str
-    def __hash__(self): ...
-    def __eq__(self, other): ...
+    def __post_init__(self) -> None: ...
+    def __hash__(self) -> int: ...
     def to_str(self, put_at_start: bool) -> str: ...
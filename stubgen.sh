@@ -1,3 +1,3 @@
-stubgen main.py macro_processor.py out_types.py expr_ast.py
+stubgen main.py macro_processor.py out_types.py expr_ast.py system_headers.py
 mv out/*.pyi ./
 rm -rf out
\ No newline at end of file
@@ -0,0 +1,12 @@
+from typing import Optional, Tuple
+
+# Path fragments of system/toolchain include trees, matched anywhere in a path so
+# sysroots (.../usr/include/) count too. /usr/local/include, Homebrew and MSYS2
+# roots are where user libraries get installed, so they are not listed.
+SYSTEM_HEADER_DIRS: Tuple[str, ...] = ("usr/include",)
+
+
+def is_system_header(path: str, system_dirs: Tuple[str, ...] = SYSTEM_HEADER_DIRS,
+                     main_header: Optional[str] = None) -> bool:
+    """True if path lies in a system include tree and is not the header being bound."""
+    return path != main_header and any(d in path for d in system_dirs)
@@ -0,0 +1,3 @@
+SYSTEM_HEADER_DIRS: tuple[str, ...]
+
+def is_system_header(path: str, system_dirs: tuple[str, ...] = ..., main_header: str | None = None) -> bool: ...
@@ -16,4 +16,9 @@
 #define HALF_MAX (MAX_SIZE / 2)
 #define QUARTER_MAX (HALF_MAX / 2)
 
+// Adjacent punctuators that must stay apart when re-joined
+#define NEG_NEG_ONE - -1
+#define POS_POS_ONE + +1
+#define NEG_NOT_ONE - !1
+
 #endif // TEST_CONSTANTS_H 
\ No newline at end of file